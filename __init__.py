@@ -26,6 +26,7 @@ import os
 import sys
 import subprocess
 from os.path import basename, dirname
+from time import time
 
 import bpy
 from bpy.props import StringProperty, BoolProperty, IntProperty, FloatProperty, EnumProperty, PointerProperty
@@ -33,6 +34,8 @@ from bpy.types import Operator, Panel, Scene, AddonPreferences, PropertyGroup
 from bpy.utils import register_class, unregister_class, previews
 
 from . import maze_gen
+from . import maze_tools
+from . import auto_layout_gen
 from . import batch_gen
 from . import text_tools
 from . import time_log
@@ -160,6 +163,7 @@ class MazeGeneratorPanelMG(Panel):
         row = layout.row()
         row.scale_y = 1.5
         row.operator("maze_gen.generate_maze", icon="MOD_BUILD")
+        layout.operator("maze_gen.generate_maze_modal", icon="TIME")
 
         # layout settings box
         box = layout.box()
@@ -179,6 +183,13 @@ class MazeGeneratorPanelMG(Panel):
         row.prop(mg, 'loops_chance', text="Chance")
 
         col.prop(mg, 'algorithm', text="", icon="OOPS")
+        col.prop(mg, 'seed')
+        row = col.row()
+        row.prop(mg, 'parallel_gen', text="Parallel Regions")
+        row.prop(mg, 'region_size', text="Size")
+        row = col.row(align=True)
+        row.prop(mg, 'checkpoint_path', text="")
+        row.operator("maze_gen.resume_maze", text="", icon="RECOVER_LAST")
         if mg.algorithm == 'BINARY_TREE':
             col.prop(mg, 'binary_dir', text="", icon="MOD_DECIM")
             col.prop(mg, 'tileable')
@@ -873,6 +884,145 @@ class GenerateMazeMG(Operator):
         return {status}
 
 
+class GenerateMazeModalMG(Operator):
+    bl_label = "Generate Maze (Responsive)"
+    bl_idname = "maze_gen.generate_maze_modal"
+    bl_description = "Generates a 3D maze without freezing Blender while the layout is made, Esc cancels"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    # layout steps between checks of the time budget
+    layout_steps = 500
+
+    time_budget = FloatProperty(
+        name="Time Budget",
+        default=0.05,
+        min=0.005,
+        max=1.0,
+        description="Seconds of layout generation per timer tick, the rest of the time is left to Blender")
+
+    def invoke(self, context, event):
+        scene = context.scene
+        mg = scene.mg
+
+        if not scene.layers[0]:
+            bpy.ops.wm.call_menu(name=menus.EnableLayerMenu.bl_idname)
+            return {'CANCELLED'}
+
+        # list mazes and parallel regions can't be made a few steps at a time
+        if mg.use_list_maze or mg.parallel_gen or not (mg.gen_3d_maze or mg.write_list_maze):
+            return self.execute(context)
+
+        # missing tiles or files that can't be saved are reported now instead of after the layout is made
+        messages, message_lvls, status = maze_gen.check_settings(context)
+        for i, message in enumerate(messages):
+            self.report({message_lvls[i]}, message)
+        if status == 'CANCELLED':
+            return {status}
+
+        addon_prefs = context.user_preferences.addons[get_addon_name()].preferences
+        if addon_prefs.only_odd_sizes:
+            maze_gen.morph_dimensions()
+        settings = auto_layout_gen.layout_settings(mg, addon_prefs.debug_mode)
+        self.generator = getattr(maze_tools, settings['generator'])(debug=settings['debug'],
+                                                                    width=settings['width'],
+                                                                    height=settings['height'],
+                                                                    seed=settings['seed'],
+                                                                    defer=True,
+                                                                    **settings['kwargs'])
+        # checkpoints are saved between the ticks, so an Esc or a crash can be picked up with Resume Maze
+        self.checkpoint_path = settings['checkpoint_path']
+        self.steps = self.generator.iter_make(self.layout_steps, self.checkpoint_path)
+        # only the time spent making the layout counts, not the time left to Blender between the ticks
+        self.layout_time = 0.0
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.01, context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        wm = context.window_manager
+
+        if event.type == 'ESC':
+            wm.event_timer_remove(self.timer)
+            wm.progress_end()
+            if self.checkpoint_path and os.path.isfile(self.checkpoint_path):
+                self.report({'INFO'}, "Maze generation cancelled, Resume Maze carries on from the last checkpoint")
+            else:
+                self.report({'INFO'}, "Maze generation cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # make as many steps as fit in the time budget, then give Blender the rest of the frame
+        tick_start = time()
+        deadline = tick_start + self.time_budget
+        for _ in self.steps:
+            if time() >= deadline:
+                self.layout_time += time() - tick_start
+                return {'RUNNING_MODAL'}
+
+        # the layout is finished, the rest (loops and geometry) is made like a normal maze
+        wm.event_timer_remove(self.timer)
+        maze = self.generator.get()
+        if context.scene.mg.allow_loops:
+            maze = auto_layout_gen.add_loops(maze)
+        self.layout_time += time() - tick_start
+
+        messages, message_lvls, status = maze_gen.make_maze(context, maze, self.layout_time)
+        for i, message in enumerate(messages):
+            self.report({message_lvls[i]}, message)
+
+        return {status}
+
+    def execute(self, context):
+        messages, message_lvls, status = maze_gen.make_maze(context)
+        for i, message in enumerate(messages):
+            self.report({message_lvls[i]}, message)
+
+        return {status}
+
+
+class ResumeMazeMG(Operator):
+    bl_label = "Resume Maze"
+    bl_idname = "maze_gen.resume_maze"
+    bl_description = "Finishes the layout saved in the checkpoint file and generates the maze from it"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        mg = scene.mg
+
+        if not scene.layers[0]:
+            bpy.ops.wm.call_menu(name=menus.EnableLayerMenu.bl_idname)
+            return {'CANCELLED'}
+
+        path = bpy.path.abspath(mg.checkpoint_path)
+        if not mg.checkpoint_path or not os.path.isfile(path):
+            self.report({'ERROR'}, "No checkpoint to resume! Set the checkpoint file to one saved while generating.")
+            return {'CANCELLED'}
+
+        # the time the layout took before it was stopped is lost, so make_maze doesn't log this one...it also
+        # sets the size to the checkpoint's, which may be from a maze of another size
+        try:
+            maze = auto_layout_gen.resume_layout(path)
+        except ValueError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+        except OSError as error:
+            self.report({'ERROR'}, "Couldn't read the checkpoint! {}".format(error))
+            return {'CANCELLED'}
+        if mg.allow_loops:
+            maze = auto_layout_gen.add_loops(maze)
+
+        messages, message_lvls, status = maze_gen.make_maze(context, maze)
+        for i, message in enumerate(messages):
+            self.report({message_lvls[i]}, message)
+
+        return {status}
+
+
 class MazeGenPropertyGroup(PropertyGroup):
     """These are all of the properties for the maze generator."""
 
@@ -888,6 +1038,30 @@ class MazeGenPropertyGroup(PropertyGroup):
         name="gen_3d_maze",
         default=True)
 
+    seed = IntProperty(
+        name="Seed",
+        default=0,
+        min=0,
+        description="Makes the same layout every time it is used, 0 = a different layout every time")
+
+    parallel_gen = BoolProperty(
+        name="parallel_gen",
+        default=False,
+        description="Generates the layout as regions in parallel processes and joins them (for big mazes)")
+
+    region_size = IntProperty(
+        name="region_size",
+        default=501,
+        min=3,
+        max=1000000,
+        description="Largest width and height of each region generated in parallel")
+
+    checkpoint_path = StringProperty(
+        name="Checkpoint",
+        subtype='FILE_PATH',
+        default="",
+        description="File to save the layout to while it generates, to resume from if Blender stops (blank = none)")
+
     # --------------------------- Tiles -------------------------------
 
     wall_4_sided = StringProperty(
@@ -1139,6 +1313,8 @@ class MazeGenPropertyGroup(PropertyGroup):
 classes = [MazeAddonPrefsMg,
            # Main
            GenerateMazeMG,
+           GenerateMazeModalMG,
+           ResumeMazeMG,
            DemoTilesImportMG,
            ShowHelpDiagramMG,
            ShowReadmeMG,
@@ -21,92 +21,188 @@
 Generates maze layout.
 
 Available Functions:
+    layout_seed - Returns the seed from the maze gen settings
     add_loops - Adds the ability to walk in circles by removing walls
+    open_loops - Removes walls between two paths by chance (without bpy)
+    generator_settings - Returns the generator class name and keyword arguments for the maze gen settings
+    layout_settings - Returns everything make_layout needs from the maze gen settings
+    make_layout - Makes a maze layout from layout_settings (without bpy)
+    make_batch_layout - Makes a layout with its loops in a batch worker process
+    layout_rows - Yields the rows of a layout that can be made a row at a time, None otherwise
+    resume_layout - Finishes the layout saved in a checkpoint (without bpy)
     make_list_maze - Constructs a python list maze based on maze gen settings
 """
 
 import random
+from time import time
 
 import bpy
 from . import maze_tools
+from . import parallel_gen
 from .addon_name import get_addon_name
 
 
-def add_loops(maze):
+def layout_seed():
+    """Returns the seed from the maze gen settings, None if it is 0 (a different maze every time)."""
+    return bpy.context.scene.mg.seed or None
+
+
+def add_loops(maze, rng=None):
     """Adds the ability to walk in circles by removing walls.
 
     Args:
         maze - python list in the format:
             [[(space in maze - x, y), is path, is walkable, active path],
             [(space in maze - x, y), is path, is walkable, active path], ...]
+        rng (optional) - (random.Random) generator to use, defaults to the 'loops' stream of the seed setting
 
     Returns:
         updated maze
     """
-    chance = bpy.context.scene.mg.loops_chance
-    for row in range(maze.width):
-        for column in range(maze.height):
-            directions = maze.find_touching_path_dirs(row, column)
-            if directions == ['N', 'S'] or directions == ['W', 'E']:
-                random_num = random.randint(1, chance)
-                if random_num == 1:
-                    maze.make_path(row, column)
-    return maze
+    if rng is None:
+        rng = maze_tools.make_rng(layout_seed(), 'loops')
+    return open_loops(maze, bpy.context.scene.mg.loops_chance, rng)
 
 
-def make_list_maze():
-    """Constructs a python list maze based on maze gen settings.
+def open_loops(maze, chance, rng=random):
+    """Removes walls between two paths by chance (without bpy, see add_loops).
+
+    Every wall with paths on exactly two opposite sides has a 1 in chance chance of being removed.  The walls
+    are all found before any are removed, in one pass over the maze, and only the ones that are picked are
+    touched (see maze_tools.pick_by_chance).  A picked wall next to one that was opened before it isn't
+    straight any more, so it's left (see maze_tools.drop_touching) and no 2x2 rooms are made.
+
+    Args:
+        maze - the maze to add loops to
+        chance - (int) 1 / chance of removing each wall that has a path on both sides
+        rng (optional) - (random.Random) generator to use
 
     Returns:
-        maze - python list in the format:
-            [[(space in maze - x, y), is path],
-            [(space in maze - x, y), is path], ...]
+        updated maze
     """
-    scene = bpy.context.scene
-    mg = scene.mg
-    x_dim = mg.mg_width
-    y_dim = mg.mg_height
-    debug = bpy.context.user_preferences.addons[get_addon_name()].preferences.debug_mode
+    picked = maze_tools.pick_by_chance(maze.straight_walls(), chance, rng)
+    maze.make_paths(maze_tools.drop_touching(picked, maze.width))
+    return maze
+
 
+def generator_settings(mg):
+    """Returns the name of the maze_tools generator class for the maze gen settings and its keyword arguments."""
     if mg.algorithm == 'BREADTH_FIRST':
-        m = maze_tools.BreadthFirstMaze(debug=debug,
-                                        width=x_dim,
-                                        height=y_dim,
-                                        bias_direction=mg.bias_direction,
-                                        bias=mg.bias)
+        return 'BreadthFirstMaze', {'bias_direction': mg.bias_direction, 'bias': mg.bias}
 
     elif mg.algorithm == 'DEPTH_FIRST':
-        m = maze_tools.DepthFirstMaze(debug=debug,
-                                      width=x_dim,
-                                      height=y_dim,
-                                      bias_direction=mg.bias_direction,
-                                      bias=mg.bias)
+        return 'DepthFirstMaze', {'bias_direction': mg.bias_direction, 'bias': mg.bias}
 
     elif mg.algorithm == 'PRIMS':
-        m = maze_tools.PrimsMaze(debug=debug,
-                                 width=x_dim,
-                                 height=y_dim,
-                                 bias_direction=mg.bias_direction,
-                                 bias=mg.bias)
+        return 'PrimsMaze', {'bias_direction': mg.bias_direction, 'bias': mg.bias}
 
     elif mg.algorithm == 'BINARY_TREE':
-        m = maze_tools.BinaryTreeMaze(debug=debug,
-                                      width=x_dim,
-                                      height=y_dim,
-                                      directions=mg.binary_dir,
-                                      tileable=mg.tileable)
+        return 'BinaryTreeMaze', {'directions': mg.binary_dir, 'tileable': mg.tileable}
 
     elif mg.algorithm == 'KRUSKALS':
-        m = maze_tools.KruskalsMaze(debug=debug,
-                                    width=x_dim,
-                                    height=y_dim)
+        return 'KruskalsMaze', {}
 
     elif mg.algorithm == 'ELLERS':
-        m = maze_tools.EllersMaze(debug=debug,
-                                  width=x_dim,
-                                  height=y_dim,
-                                  bias=mg.bias)
+        return 'EllersMaze', {'bias': mg.bias}
 
-    maze = m.get()
 
-    return maze
+def layout_settings(mg, debug=True):
+    """Returns everything make_layout needs from the maze gen settings.
+
+    It's a plain dict, so it can be sent to other processes (which can't read bpy).
+    """
+    generator, kwargs = generator_settings(mg)
+    return {'generator': generator,
+            'kwargs': kwargs,
+            'width': mg.mg_width,
+            'height': mg.mg_height,
+            'seed': mg.seed or None,
+            'allow_loops': mg.allow_loops,
+            'loops_chance': mg.loops_chance,
+            'parallel_gen': mg.parallel_gen,
+            'region_size': mg.region_size,
+            'checkpoint_path': bpy.path.abspath(mg.checkpoint_path) if mg.checkpoint_path else "",
+            'debug': debug}
+
+
+def make_layout(settings, show_progress=True, processes=None):
+    """Makes a maze layout from layout_settings (without bpy).
+
+    Args:
+        settings - (dict) settings from layout_settings
+        show_progress (optional) - (boolean) show the Blender progress while generating
+        processes (optional) - (int) number of worker processes for parallel regions, None = one per core
+
+    Returns:
+        maze - the maze layout (without loops)
+    """
+    if settings['parallel_gen']:
+        # regions are generated in worker processes and stitched together
+        return parallel_gen.make_parallel_maze(settings['generator'], settings['width'], settings['height'],
+                                               region_size=settings['region_size'], processes=processes,
+                                               seed=settings['seed'], debug=settings['debug'],
+                                               show_progress=show_progress, **settings['kwargs'])
+
+    m = getattr(maze_tools, settings['generator'])(debug=settings['debug'],
+                                                   width=settings['width'],
+                                                   height=settings['height'],
+                                                   show_progress=show_progress,
+                                                   seed=settings['seed'],
+                                                   defer=bool(settings['checkpoint_path']),
+                                                   **settings['kwargs'])
+    if settings['checkpoint_path']:
+        m.make_with_checkpoints(settings['checkpoint_path'])
+    return m.get()
+
+
+def layout_rows(settings):
+    """Yields the rows of the layout if it can be made a row at a time (without bpy), returns None otherwise.
+
+    Only Eller's mazes without loops are made a row at a time (see maze_tools.ellers_rows), they come out the
+    same as the EllersMaze the settings would make.
+    """
+    if settings['generator'] != 'EllersMaze' or settings['allow_loops'] or settings['parallel_gen']:
+        return None
+    return maze_tools.ellers_rows(settings['width'], settings['height'], settings['kwargs']['bias'],
+                                  maze_tools.make_rng(settings['seed']))
+
+
+def make_batch_layout(settings):
+    """Makes a layout with its loops in a batch worker process (see batch_gen.BatchGenerateMazeMG).
+
+    Workers are daemons, so they can't start processes of their own for parallel regions.
+
+    Returns:
+        maze - the layout with its loops, None if settings is None (a setup that doesn't make a layout)
+        layout_time - seconds it took to make the layout (for the time log), None if settings is None
+    """
+    if settings is None:
+        return None, None
+    time_start = time()
+    maze = make_layout(settings, show_progress=False, processes=1)
+    if settings['allow_loops']:
+        maze = open_loops(maze, settings['loops_chance'], maze_tools.make_rng(settings['seed'], 'loops'))
+    return maze, time() - time_start
+
+
+def resume_layout(path, show_progress=True):
+    """Finishes the layout saved in the checkpoint at path (without bpy), still saving checkpoints as it goes.
+
+    Returns:
+        maze - the maze layout (without loops)
+    """
+    m = maze_tools.load_checkpoint(path, show_progress)
+    m.make_with_checkpoints(path)
+    return m.get()
+
+
+def make_list_maze():
+    """Constructs a python list maze based on maze gen settings.
+
+    Returns:
+        maze - python list in the format:
+            [[(space in maze - x, y), is path],
+            [(space in maze - x, y), is path], ...]
+    """
+    debug = bpy.context.user_preferences.addons[get_addon_name()].preferences.debug_mode
+    return make_layout(layout_settings(bpy.context.scene.mg, debug))
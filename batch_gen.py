@@ -22,14 +22,19 @@ Batch tools for mazes
 
 Available Functions:
     refresh_batch_max - Refreshes number of batch mazes by checking txt file
+    batch_layout_settings - Returns the layout settings of every stored maze setup
 """
 
 import os
+import random
 
 import bpy
 
 from . import maze_gen
 from . import menus
+from . import auto_layout_gen
+from . import parallel_gen
+from .addon_name import get_addon_name
 
 
 def refresh_batch_max():
@@ -52,6 +57,12 @@ def refresh_batch_max():
 def load_batch_settings(context, maze_setup):
     scene = context.scene
     mg = scene.mg
+
+    # setups stored before these settings were added don't have them, use the defaults rather than the UI's
+    mg.seed = 0
+    mg.parallel_gen = False
+    mg.region_size = 501
+
     for slot in maze_setup:
         parts = slot.split(",")
 
@@ -72,6 +83,12 @@ def load_batch_settings(context, maze_setup):
             mg.list_maze = parts[1]
         elif parts[0] == "wl":
             mg.write_list_maze = bool(int(parts[1]))
+        elif parts[0] == "sd":
+            mg.seed = int(parts[1])
+        elif parts[0] == "pg":
+            mg.parallel_gen = bool(int(parts[1]))
+        elif parts[0] == "rs":
+            mg.region_size = int(parts[1])
 
         # algorithm settings
         elif parts[0] == 'ag':
@@ -140,6 +157,39 @@ def load_batch_settings(context, maze_setup):
             mg.no_path = parts[1]
 
 
+def batch_layout_settings(context, maze_setups):
+    """Returns the layout settings of every stored maze setup, None for setups that don't make a layout.
+
+    Args:
+        context - context of the operator
+        maze_setups - [[setting slot, ...], ...] for every stored maze
+
+    Returns:
+        [settings from auto_layout_gen.layout_settings or None, ...] in the same order as maze_setups
+    """
+    mg = context.scene.mg
+    addon_prefs = bpy.context.user_preferences.addons[get_addon_name()].preferences
+
+    all_settings = []
+    for maze_setup in maze_setups:
+        load_batch_settings(context, maze_setup)
+        # list mazes are read from text blocks, which only the main process can do
+        if mg.use_list_maze or not (mg.gen_3d_maze or mg.write_list_maze):
+            all_settings.append(None)
+            continue
+
+        if addon_prefs.only_odd_sizes:
+            maze_gen.morph_dimensions()
+        settings = auto_layout_gen.layout_settings(mg, addon_prefs.debug_mode)
+        # forked workers all start with the same random state, so every layout gets a seed of its own
+        if settings['seed'] is None:
+            settings['seed'] = random.getrandbits(64)
+        # the layouts are made at the same time, so they can't share a checkpoint file
+        settings['checkpoint_path'] = ""
+        all_settings.append(settings)
+    return all_settings
+
+
 class StoreBatchMazeMG(bpy.types.Operator):
     bl_label = "Store Settings"
     bl_idname = "maze_gen.store_batch_maze"
@@ -149,7 +199,7 @@ class StoreBatchMazeMG(bpy.types.Operator):
     def execute(self, context):
         mg = context.scene.mg
         settings_text = (" && wd,{};ht,{};3d,{};al,{};lc,{};"
-                         "fl,{};lm,{};wl,{};"
+                         "fl,{};lm,{};wl,{};sd,{};pg,{};rs,{};"
                          "ag,{};br,{};bd,{};ti,{};bi,{};"
                          "tb,{};im,{};mo,{};am,{};rd,{};"
                          "w0,{};w1,{};w2,{};w3,{};w4,{};wc,{};"
@@ -163,6 +213,9 @@ class StoreBatchMazeMG(bpy.types.Operator):
                             int(mg.use_list_maze),
                             mg.list_maze,
                             int(mg.write_list_maze),
+                            mg.seed,
+                            int(mg.parallel_gen),
+                            mg.region_size,
                             mg.algorithm,
                             mg.bias_direction,
                             mg.binary_dir,
@@ -353,12 +406,18 @@ class BatchGenerateMazeMG(bpy.types.Operator):
                         "store current maze settings.")
             return {'CANCELLED'}
 
-        for maze_setup in split_settings:
-            maze_setup = maze_setup.split(";")
+        maze_setups = [maze_setup.split(";") for maze_setup in split_settings]
+
+        # the layouts need no bpy, so worker processes make them in order while the geometry of the ones
+        # before is built here...layout N + 1 is ready by the time maze N is done
+        layouts = parallel_gen.map_jobs(batch_layout_settings(context, maze_setups), None,
+                                        auto_layout_gen.make_batch_layout, ordered=True)
+
+        for maze_setup, (layout, layout_time) in zip(maze_setups, layouts):
             load_batch_settings(context, maze_setup)
 
             # generate maze here...ignore the status unless it is cancelled
-            messages, message_lvls, status = maze_gen.make_maze(context)
+            messages, message_lvls, status = maze_gen.make_maze(context, layout, layout_time)
             for i, message in enumerate(messages):
                 self.report({message_lvls[i]}, message)
             if status == 'CANCELLED':
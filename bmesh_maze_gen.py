@@ -17,6 +17,8 @@
 # along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+from array import array
+
 import bpy
 import bmesh
 
@@ -43,83 +45,96 @@ def quad_mesh_builder(verts, faces):
     for f in faces:
         bm.faces.new([bverts[f[0]], bverts[f[1]], bverts[f[2]], bverts[f[3]]])
 
+    # the same as normals_make_consistent(inside=True), without going into edit mode
+    bmesh.ops.recalc_face_normals(bm, faces=bm.faces)
+    bmesh.ops.reverse_faces(bm, faces=bm.faces)
+
     # Finish up, write the bmesh back to the mesh
     bm.to_mesh(me)
     bm.free()  # free and prevent further access
 
 
 class Make3DMaze:
+    """Makes the 3D mesh of a maze out of quads.
+
+    Every vertex is a corner of a space: corner (i, j) is at (i - 0.5, -(j - 0.5)) on the floor (z = 0) or the
+    top of the walls (z = 1).  The quads look their corners up in self.corner_verts and only add the ones that
+    aren't there yet, so touching quads share their vertices and the mesh is already welded (no remove_doubles).
+    """
     def __init__(self, maze):
         self.verts = []
         self.faces = []
 
+        # index in self.verts of every corner, -1 until it is used
+        self.corners_width = maze.width + 1
+        self.corners_layer = self.corners_width * (maze.height + 1)
+        self.corner_verts = array('i', [-1]) * (2 * self.corners_layer)
+
         self.make_3dmaze(maze)
 
+    def corner(self, i, j, z):
+        """Returns the index of the vertex at corner (i, j) and height z, adding it the first time it's used."""
+        key = z * self.corners_layer + j * self.corners_width + i
+        vert_ind = self.corner_verts[key]
+        if vert_ind < 0:
+            vert_ind = len(self.verts)
+            self.corner_verts[key] = vert_ind
+            self.verts.append((i - 0.5, -(j - 0.5), z))
+        return vert_ind
+
     def add_hor_plane(self, x, y, z):
-        vert_ind = len(self.verts)
-        self.verts.append((x - 0.5, -(y + 0.5), z))
-        self.verts.append((x + 0.5, -(y + 0.5), z))
-        self.verts.append((x + 0.5, -(y - 0.5), z))
-        self.verts.append((x - 0.5, -(y - 0.5), z))
+        corner = self.corner
+        self.faces.append([corner(x, y + 1, z), corner(x + 1, y + 1, z), corner(x + 1, y, z), corner(x, y, z)])
+
+    def add_wall_plane(self, x, y, path_x, path_y):
+        """Adds the vertical wall between the wall space (x, y) and the touching path space."""
+        corner = self.corner
+
+        # check for on x-axis!...y-axis
+        if path_x == x:
+            # the corners between the two spaces
+            j = max(y, path_y)
+            self.faces.append([corner(x, j, 1), corner(x + 1, j, 1), corner(x + 1, j, 0), corner(x, j, 0)])
 
-        self.faces.append([vert_ind, vert_ind + 1, vert_ind + 2, vert_ind + 3])
+        else:
+            i = max(x, path_x)
+            self.faces.append([corner(i, y, 1), corner(i, y + 1, 1), corner(i, y + 1, 0), corner(i, y, 0)])
 
     def make_3dmaze(self, maze):
         """Makes basic 3D maze from python list."""
 
         debug = bpy.context.user_preferences.addons[get_addon_name()].preferences.debug_mode
 
-        bldr_prog = BlenderProgress("3D Maze Gen", debug)
+        bldr_prog = BlenderProgress("3D Maze Gen", debug, throttle=True)
+        bldr_prog.set_total(maze.width * maze.height)
         bldr_prog.start()
-        maze_length = len(maze)
 
-        loops = 0
+        # query the whole maze at once instead of testing every neighbor of every space
+        paths = maze.to_array().T.tolist()
+        north, west, east, south = [mask.T.tolist() for mask in maze.path_masks()]
 
         # iterate over every space in the maze
         for x in range(maze.width):
             for y in range(maze.height):
-                if maze.is_path(x, y):
+                if paths[x][y]:
                     self.add_hor_plane(x, y, 0)
 
                 else:
                     self.add_hor_plane(x, y, 1)
 
-                    for i, d in enumerate(maze.find_touching(x, y)):
-                        if maze.exist_test(d[0], d[1]):
-                            if maze.is_path(d[0], d[1]):
-                                # check for on x-axis!...y-axis
-                                if d[0] == x:
-                                    y_avg = -((d[1] + y) / 2)
-                                    vert_ind = len(self.verts)
+                    # add a wall facing each touching path (same order as Maze.find_touching)
+                    if north[x][y]:
+                        self.add_wall_plane(x, y, x, y + 1)
+                    if west[x][y]:
+                        self.add_wall_plane(x, y, x - 1, y)
+                    if east[x][y]:
+                        self.add_wall_plane(x, y, x + 1, y)
+                    if south[x][y]:
+                        self.add_wall_plane(x, y, x, y - 1)
 
-                                    self.verts.append((d[0] - 0.5, y_avg, 1))
-                                    self.verts.append((d[0] + 0.5, y_avg, 1))
-                                    self.verts.append((d[0] + 0.5, y_avg, 0))
-                                    self.verts.append((d[0] - 0.5, y_avg, 0))
-
-                                    self.faces.append([vert_ind, vert_ind + 1, vert_ind + 2, vert_ind + 3])
-
-                                else:
-                                    x_avg = (d[0] + x) / 2
-                                    vert_ind = len(self.verts)
-
-                                    self.verts.append((x_avg, -(d[1] - 0.5), 1))
-                                    self.verts.append((x_avg, -(d[1] + 0.5), 1))
-                                    self.verts.append((x_avg, -(d[1] + 0.5), 0))
-                                    self.verts.append((x_avg, -(d[1] - 0.5), 0))
-
-                                    self.faces.append([vert_ind, vert_ind + 1, vert_ind + 2, vert_ind + 3])
-
-                progress = loops / maze_length
-                bldr_prog.update(progress)
+                bldr_prog.tick()
 
+        # the vertices are shared already, so there are no doubles to remove
         quad_mesh_builder(self.verts, self.faces)
 
         bldr_prog.finish()
-
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.mesh.remove_doubles()
-        bpy.ops.mesh.normals_make_consistent(inside=True)
-        bpy.ops.mesh.select_all(action='DESELECT')
-        bpy.ops.object.mode_set(mode='OBJECT')
@@ -39,9 +39,9 @@ def morph_dimensions():
         mg.mg_height += 1
 
 
-def make_maze(context):
+def check_settings(context):
     """
-    Makes a maze based on the settings specified in the UI.
+    Checks that all needed tiles and lists have been provided and saves the files (if always save is on).
 
     Args:
         context: context of the operator
@@ -49,14 +49,11 @@ def make_maze(context):
     Returns:
         message: message to print to user
         message_lvl: level to print message as, 'INFO', 'WARNING', 'ERROR'
-        status: whether operator is 'FINISHED', 'CANCELLED', or other status
+        status: 'FINISHED' if the maze can be made, otherwise 'CANCELLED'
     """
-    addon_prefs = bpy.context.user_preferences.addons[get_addon_name()].preferences
-
     messages = []
     message_lvls = []
     mg = context.scene.mg
-    time_start = time()
 
     # check that all needed tiles and lists have been provided
     if mg.tile_based and mg.gen_3d_maze:
@@ -92,16 +89,60 @@ def make_maze(context):
         message_lvls += ['ERROR']
         return messages, message_lvls, 'CANCELLED'
 
+    return messages, message_lvls, 'FINISHED'
+
+
+def make_maze(context, maze=None, layout_time=None):
+    """
+    Makes a maze based on the settings specified in the UI.
+
+    Args:
+        context: context of the operator
+        maze: layout made ahead of time (with loops already added), None = make it from the settings
+        layout_time: seconds it took to make maze, None = don't log the time (it would only be the time to
+            mesh the layout, which would throw off the time estimates)
+
+    Returns:
+        message: message to print to user
+        message_lvl: level to print message as, 'INFO', 'WARNING', 'ERROR'
+        status: whether operator is 'FINISHED', 'CANCELLED', or other status
+    """
+    addon_prefs = bpy.context.user_preferences.addons[get_addon_name()].preferences
+
+    mg = context.scene.mg
+    time_start = time()
+
+    # the settings can change while a responsive maze's layout is made, so they're checked again here
+    messages, message_lvls, status = check_settings(context)
+    if status == 'CANCELLED':
+        return messages, message_lvls, status
+
     if mg.gen_3d_maze or mg.write_list_maze:
-        if addon_prefs.only_odd_sizes:
+        maze_made_here = maze is None
+        if not maze_made_here:
+            # a layout made ahead of time (batch, resumed...) already has its size, so the scene has to match it
+            mg.mg_width = maze.width
+            mg.mg_height = maze.height
+        elif addon_prefs.only_odd_sizes:
             morph_dimensions()
-        if mg.use_list_maze:
-            maze = txt_img_converter.convert_list_maze()
-        else:
-            maze = auto_layout_gen.make_list_maze()
+        rows = None
+        if maze is None and not mg.use_list_maze and not mg.gen_3d_maze:
+            # only the text block is wanted, so layouts made a row at a time never need the whole grid
+            rows = auto_layout_gen.layout_rows(auto_layout_gen.layout_settings(mg))
+
+        text_block_name = None
+        if rows is not None:
+            text_block_name = txt_img_converter.write_rows_to_text(rows, mg.mg_width, mg.mg_height)
+
+        # batch generation makes the layouts ahead of time
+        elif maze is None:
+            if mg.use_list_maze:
+                maze = txt_img_converter.convert_list_maze()
+            else:
+                maze = auto_layout_gen.make_list_maze()
 
-        if mg.allow_loops:
-            maze = auto_layout_gen.add_loops(maze)
+            if mg.allow_loops:
+                maze = auto_layout_gen.add_loops(maze)
 
         # 3D generation
         if mg.gen_3d_maze:
@@ -114,7 +155,11 @@ def make_maze(context):
             bpy.ops.view3d.snap_selected_to_cursor(use_offset=False)
 
         elapsed_time = time() - time_start
-        time_log.log_time(elapsed_time)
+        if maze_made_here:
+            time_log.log_time(elapsed_time)
+        elif layout_time is not None:
+            elapsed_time += layout_time
+            time_log.log_time(elapsed_time)
         time_disp = TimeDisplay()
         time_disp.convert(elapsed_time)
         messages += ["Finished generating maze in " + str(time_disp)]
@@ -122,7 +167,8 @@ def make_maze(context):
 
         # write list maze if enabled
         if mg.write_list_maze:
-            text_block_name = txt_img_converter.str_list_maze(maze)
+            if text_block_name is None:
+                text_block_name = txt_img_converter.str_list_maze(maze)
             messages += ["See '" + str(text_block_name) + "' in the text editor"]
             message_lvls += ['INFO']
 
@@ -19,16 +19,35 @@
 
 IN_BLENDER = True
 
+import argparse
+import hashlib
+import json
+import math
+import os
 import random
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from collections import deque
+from time import time
+
+# numpy ships with Blender, but the maze tools also run in a plain python install
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 if IN_BLENDER:
     from . import weira
-    from .trees import Tree
+    from .trees import DisjointSet
+    from .terminal_display import TerminalDisplay, maze_rows, maze_text
     from .progress_display import BlenderProgress
     from .logging_setup import setup_logger
 else:
     import weira
-    from trees import Tree
+    from trees import DisjointSet
+    from terminal_display import TerminalDisplay, maze_rows, maze_text
     from time import sleep
     from logging_setup import setup_logger
 
@@ -47,6 +66,160 @@ def find_all(lst, value):
     return [i for i, a in enumerate(lst) if a == value]
 
 
+def derive_seed(seed, *keys):
+    """Returns a 64 bit seed for the stream named by keys, e.g. derive_seed(seed, 'region', 3).
+
+    The seed and keys are hashed, so every stream is independent of the others and is the same in every run
+    and every process (unlike hash(), which is salted per process).
+    """
+    digest = hashlib.sha256(repr((seed,) + keys).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def make_rng(seed=None, *keys):
+    """Returns a random.Random for the stream of seed named by keys, or the random module if seed is None."""
+    if seed is None:
+        return random
+    return random.Random(derive_seed(seed, *keys))
+
+
+def pick_by_chance(items, chance, rng=random):
+    """Returns the items picked when each one has a 1 in chance chance, in their order.
+
+    Instead of drawing a random number for every item, numpy draws how many are picked from the binomial
+    distribution and then picks that many.  Without numpy, the gaps between the picks are drawn from the
+    geometric distribution, so it still only takes a random number per pick.
+
+    Args:
+        items - (sequence or numpy array) items to pick from
+        chance - (int) 1 / chance of picking each item
+        rng (optional) - (random.Random) generator to draw from (numpy is seeded from it)
+
+    Returns:
+        the picked items as a numpy array with numpy, otherwise a list
+    """
+    n = len(items)
+    if np is not None:
+        # RandomState (not default_rng) is in every numpy Blender ships with
+        np_rng = np.random.RandomState(rng.getrandbits(32))
+        picks = np_rng.choice(n, np_rng.binomial(n, min(1.0, 1.0 / chance)), replace=False)
+        # back in scan order
+        picks.sort()
+        return np.asarray(items)[picks]
+
+    if chance <= 1:
+        return list(items)
+
+    log_miss = math.log(1 - 1 / chance)
+    picked = []
+    i = -1
+    while True:
+        # number of items missed before the next pick (1 - random() is never 0)
+        i += 1 + int(math.log(1 - rng.random()) / log_miss)
+        if i >= n:
+            return picked
+        picked.append(items[i])
+
+
+# rounds of drop_touching done with whole-array numpy operations before the rest are done one at a time
+DROP_ROUNDS = 16
+
+
+def drop_touching(indexes, width):
+    """Returns the indexes (y * width + x) left after dropping each one next to an earlier one that was kept.
+
+    Opening a space next to a straight wall gives the wall a third path, so opening both would make a 2x2 room.
+    Earlier is in the order open_loops checks the spaces in (up each column, from x = 0), so these are the
+    walls that are still straight when they're checked again just before they're opened.  With numpy, every
+    round decides the indexes whose earlier neighbours (west and south) are decided.  Most touching indexes
+    come in short lines, so the few left after DROP_ROUNDS rounds are decided one at a time.
+
+    Args:
+        indexes - (sequence or numpy array) indexes of the spaces to open, like pick_by_chance returns
+        width - (int) width of the maze
+
+    Returns:
+        the kept indexes as a numpy array with numpy, otherwise a list
+    """
+    if np is not None:
+        indexes = np.asarray(indexes, dtype=np.int64)
+        if not len(indexes):
+            return indexes
+        # state of every space: 0 = not picked, 1 = not decided yet, 2 = kept, 3 = dropped...the last one is
+        # never picked and stands in for the neighbours off the maze
+        state = np.zeros(int(indexes.max()) + 2, dtype=np.uint8)
+        state[indexes] = 1
+        outside = len(state) - 1
+        west = np.where(indexes % width > 0, indexes - 1, outside)
+        south = np.where(indexes >= width, indexes - width, outside)
+
+        undecided = indexes
+        for _ in range(DROP_ROUNDS):
+            if not len(undecided):
+                break
+            west_state = state[west]
+            south_state = state[south]
+            dropped = (west_state == 2) | (south_state == 2)
+            kept = ~dropped & (west_state != 1) & (south_state != 1)
+            state[undecided[dropped]] = 3
+            state[undecided[kept]] = 2
+            left = ~(dropped | kept)
+            undecided, west, south = undecided[left], west[left], south[left]
+
+        # long lines (like the ones across the corridors of biased mazes) in the order they're checked
+        order = np.lexsort((undecided // width, undecided % width))
+        for i, west_i, south_i in zip(undecided[order].tolist(), west[order].tolist(), south[order].tolist()):
+            state[i] = 3 if state[west_i] == 2 or state[south_i] == 2 else 2
+        return indexes[state[indexes] == 2]
+
+    kept = set()
+    for i in sorted(indexes, key=lambda i: (i % width, i // width)):
+        if (i % width > 0 and i - 1 in kept) or i - width in kept:
+            continue
+        kept.add(i)
+    return sorted(kept)
+
+
+# bits of a connectivity mask (see Maze.connectivity_masks), directions match Maze.find_touching_path_dirs
+DIRECTION_BITS = {'N': 1, 'W': 2, 'E': 4, 'S': 8}
+
+# masks of the spaces with paths on exactly two opposite sides
+STRAIGHT_MASKS = (DIRECTION_BITS['N'] | DIRECTION_BITS['S'], DIRECTION_BITS['W'] | DIRECTION_BITS['E'])
+
+
+# translation table from the bytes of a row to the '1' and '0' characters of a text maze
+TEXT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+# translation tables from any byte to '0' (0) or '1' (anything else) and back, to pack a grid into bits
+BIT_DIGITS = bytes.maketrans(bytes(range(256)), b'0' + b'1' * 255)
+DIGIT_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+# checkpoint files start with the magic bytes and the version of their format (see OrthogonalMaze.save_checkpoint)
+CHECKPOINT_MAGIC = b'UltiMaze checkpoint\n'
+CHECKPOINT_VERSION = 1
+# the only array types a checkpoint can hold
+CHECKPOINT_TYPECODES = ('B', 'i', 'q')
+# the keys every checkpoint header has (see OrthogonalMaze.save_checkpoint)
+CHECKPOINT_KEYS = ('version', 'generator', 'width', 'height', 'storage', 'seed', 'debug', 'kwargs', 'values',
+                   'byteorder', 'arrays')
+
+
+def pack_bits(spaces):
+    """Returns the spaces packed 8 to a byte, every non-zero space is a 1 (see unpack_bits).
+
+    The spaces are read as one binary number, which python converts in linear time, so this is fast without
+    numpy.  A leading 1 is added so the number keeps its leading zeros.
+    """
+    digits = b'1' + bytes(spaces).translate(BIT_DIGITS)
+    return int(digits, 2).to_bytes(-(-len(digits) // 8), 'big')
+
+
+def unpack_bits(packed):
+    """Returns the bytearray of 1's and 0's packed by pack_bits."""
+    return bytearray(bin(int.from_bytes(packed, 'big'))[3:].encode('ascii').translate(DIGIT_BITS))
+
+
 class Maze:
     """The wrapper object for storing a maze.
 
@@ -62,6 +235,18 @@ class Maze:
         exist_test - Checks if ordered pair exists within maze size.
         find_touching_path_dirs - Returns the directions in which there is a path adjacent to space (x, y), separated by given distance.
         find_exist_touching - Finds the spaces that touch x and y separated by 'dist'.
+        count_touching_paths - Returns how many of the spaces touching (x, y) are paths.
+        padded_array - Returns the maze as a numpy array with a border of walls.
+        to_array - Returns a numpy boolean array that is True for every path space.
+        get_cells - Returns a numpy boolean array of whether each of the given spaces is a path.
+        set_cells - Makes all the given spaces paths (or walls).
+        make_paths - Makes the spaces at the given indexes (y * width + x) paths.
+        path_masks - Returns numpy boolean arrays of which spaces have a path to the N, W, E and S.
+        neighbour_counts - Returns a numpy array of how many paths touch each space.
+        connectivity_masks - Returns a bytearray with the directions of the touching paths of every space.
+        straight_walls - Returns the indexes of the walls with paths on exactly two opposite sides.
+        get_row - Returns row y as a bytearray (1 = path, 0 = wall).
+        set_row - Sets row y from a sequence of 1's and 0's.
     """
     def __init__(self, width, height, walls=True):
         """Sets up maze, width, and height, then calls make_base_grid to setup grid."""
@@ -203,13 +388,445 @@ class Maze:
 
         return touching_xy
 
+    def count_touching_paths(self, x, y):
+        """Returns how many of the spaces touching (x, y) are paths."""
+        return len(self.find_touching_path_dirs(x, y))
+
+    def get_row(self, y):
+        """Returns row y as a bytearray of width bytes (1 = path, 0 = wall)."""
+        return bytearray(1 if self.is_path(x, y) else 0 for x in range(self.width))
+
+    def set_row(self, y, row):
+        """Sets row y from a sequence of width 1's (paths) and 0's (walls), like the rows from ellers_rows."""
+        for x, space in enumerate(row):
+            if space:
+                self.make_path(x, y)
+            else:
+                self.make_wall(x, y)
+
+    def padded_array(self):
+        """Returns the maze as a numpy array with a border of walls.
+
+        Returns:
+            (numpy.ndarray) uint8 array of shape (height + 2, width + 2) indexed [y + 1, x + 1]
+        """
+        padded = np.zeros((self.height + 2, self.width + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = np.array(self.get_maze(), dtype=np.uint8).T
+        return padded
+
+    def to_array(self):
+        """Returns a numpy boolean array of shape (height, width) that is True for every path space."""
+        return self.padded_array()[1:-1, 1:-1] != 0
+
+    def get_cells(self, xs, ys):
+        """Returns a numpy boolean array of whether each of the given spaces is a path.
+
+        Args:
+            xs - (sequence of ints) the x coordinates of the spaces
+            ys - (sequence of ints) the y coordinates of the spaces
+        """
+        return self.padded_array()[np.asarray(ys) + 1, np.asarray(xs) + 1] != 0
+
+    def set_cells(self, xs, ys, path=True):
+        """Makes all the given spaces paths (or walls if path is False).
+
+        Args:
+            xs - (sequence of ints) the x coordinates of the spaces
+            ys - (sequence of ints) the y coordinates of the spaces
+            path - (boolean) make the spaces paths, False = make them walls
+        """
+        make = self.make_path if path else self.make_wall
+        for x, y in zip(xs, ys):
+            make(int(x), int(y))
+
+    def make_paths(self, indexes):
+        """Makes the spaces at the given indexes (y * width + x, like straight_walls returns) paths."""
+        width = self.width
+        for i in indexes:
+            y, x = divmod(int(i), width)
+            self.make_path(x, y)
+
+    def path_masks(self):
+        """Returns numpy boolean arrays of which spaces have a path to the N, W, E and S.
+
+        The directions match find_touching_path_dirs, so N is (x, y + 1) and S is (x, y - 1).  Spaces
+        outside the maze count as walls.
+
+        Returns:
+            (tuple of numpy.ndarray) north, west, east and south masks of shape (height, width)
+        """
+        padded = self.padded_array() != 0
+        return padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:], padded[:-2, 1:-1]
+
+    def neighbour_counts(self):
+        """Returns a numpy uint8 array of shape (height, width) of how many paths touch each space."""
+        counts = np.zeros((self.height, self.width), dtype=np.uint8)
+        for mask in self.path_masks():
+            counts += mask
+        return counts
+
+    def connectivity_masks(self):
+        """Returns a bytearray with the directions of the touching paths of every space.
+
+        Space (x, y) is at index y * width + x and its value has a bit from DIRECTION_BITS set for each
+        direction find_touching_path_dirs would return (N = 1, W = 2, E = 4, S = 8).  Spaces outside the
+        maze count as walls.  Uses numpy when it is available, otherwise one pass over the grid.
+        """
+        if np is not None:
+            masks = np.zeros((self.height, self.width), dtype=np.uint8)
+            for direction, mask in zip(('N', 'W', 'E', 'S'), self.path_masks()):
+                masks[mask] |= DIRECTION_BITS[direction]
+            return bytearray(masks.tobytes())
+
+        width = self.width
+        # columns of the maze with a wall added at each end, plus a column of walls on each side
+        wall_column = [0] * (self.height + 2)
+        columns = [wall_column] + [[0] + list(col) + [0] for col in self.get_maze()] + [wall_column]
+
+        masks = bytearray(width * self.height)
+        for x in range(width):
+            west, column, east = columns[x], columns[x + 1], columns[x + 2]
+            for y in range(self.height):
+                masks[y * width + x] = column[y + 2] | west[y + 1] << 1 | east[y + 1] << 2 | column[y] << 3
+        return masks
+
+    def straight_walls(self):
+        """Returns the indexes (y * width + x) of the walls with paths on exactly two opposite sides.
+
+        These are the walls that make a loop when they are removed (see auto_layout_gen.open_loops).  Found
+        with whole-grid numpy operations when numpy is available (then it's a numpy array), otherwise in one
+        pass over the connectivity masks.
+        """
+        if np is not None:
+            north, west, east, south = self.path_masks()
+            straight = north & south & ~(west | east) | west & east & ~(north | south)
+            return np.flatnonzero(straight & ~self.to_array())
+
+        width = self.width
+        return [i for i, mask in enumerate(self.connectivity_masks())
+                if mask in STRAIGHT_MASKS and not self.is_path(i % width, i // width)]
+
+
+class ByteMaze(Maze):
+    """Maze stored in a flat bytearray with one byte per space and a border of walls.
+
+    Spaces are stored row by row with a one space wall border around the maze, so the space (x, y)
+    lives at index (y + 1) * stride + x + 1 where stride = width + 2.  Because of the border, is_path
+    works for any x from -1 to width and any y from -1 to height, so reading the spaces touching a
+    space never needs exist_test.  This uses an eighth of the memory of the list of lists in Maze
+    and keeps the same API.
+
+    Methods:
+        __len__ - Override for python len().
+        make_base_grid - Sets up self.maze as a padded bytearray based on x and y dimensions.
+        get_maze - Returns maze as a list of columns (same format as Maze.get_maze).
+        index - Returns the index of space (x, y) in self.maze.
+        is_path - Returns if space defined by x and y is a path.
+        make_path - Makes the space defined by x and y a path.
+        make_wall - Makes the space defined by x and y a wall.
+        clear_border - Makes every space in the border a wall again.
+        get_row - Returns row y as a bytearray (a copy of the slice of self.maze).
+        set_row - Sets row y from a sequence of 1's and 0's (a slice assignment).
+        find_touching_path_dirs - Returns the directions in which there is a path adjacent to space (x, y).
+        count_touching_paths - Returns how many of the spaces touching (x, y) are paths.
+        padded_array - Returns a numpy view of self.maze (not a copy).
+        make_paths - Makes the spaces at the given indexes paths, in one assignment with numpy.
+    """
+    def __len__(self):
+        """Override for python len()."""
+        return self.width
+
+    def make_base_grid(self, walls):
+        """Sets up self.maze as a padded bytearray based on x and y dimensions.
+
+        Args:
+            walls - make all spaces in the grid walls, False = make all spaces paths
+        """
+        self.stride = self.width + 2
+        self.maze = bytearray(self.stride * (self.height + 2))
+        if not walls:
+            row = bytearray(b'\x01') * self.width
+            for y in range(self.height):
+                start = self.index(0, y)
+                self.maze[start:start + self.width] = row
+
+    def get_maze(self):
+        """Returns maze as a list of columns (same format as Maze.get_maze)."""
+        end = self.index(0, self.height)
+        return [list(self.maze[self.index(x, 0):end:self.stride]) for x in range(self.width)]
+
+    def index(self, x, y):
+        """Returns the index of space (x, y) in self.maze."""
+        return (y + 1) * self.stride + x + 1
+
+    def is_path(self, x, y):
+        """Returns if space defined by x and y is a path."""
+        return self.maze[(y + 1) * self.stride + x + 1]
+
+    def make_path(self, x, y):
+        """Makes the space defined by x and y a path."""
+        self.maze[(y + 1) * self.stride + x + 1] = 1
+
+    def make_wall(self, x, y):
+        """Makes the space defined by x and y a wall."""
+        self.maze[(y + 1) * self.stride + x + 1] = 0
+
+    def clear_border(self, value=0):
+        """Makes every space in the border a wall again (for generators that carve into it).
+
+        Args:
+            value - (int) byte to fill the border with, generators may use a non-zero sentinel while carving
+        """
+        num_rows = self.height + 2
+        self.maze[:self.stride] = bytes([value]) * self.stride
+        self.maze[-self.stride:] = bytes([value]) * self.stride
+        self.maze[::self.stride] = bytes([value]) * num_rows
+        self.maze[self.stride - 1::self.stride] = bytes([value]) * num_rows
+
+    def get_row(self, y):
+        """Returns row y as a bytearray of width bytes (1 = path, 0 = wall)."""
+        start = self.index(0, y)
+        return self.maze[start:start + self.width]
+
+    def set_row(self, y, row):
+        """Sets row y from a sequence of width 1's (paths) and 0's (walls), like the rows from ellers_rows."""
+        start = self.index(0, y)
+        self.maze[start:start + self.width] = row
+
+    def find_touching_path_dirs(self, x, y, dist=1):
+        """Returns the directions in which there is a path adjacent to space (x, y), separated by given distance."""
+        if dist != 1:
+            return super().find_touching_path_dirs(x, y, dist)
+
+        maze = self.maze
+        i = (y + 1) * self.stride + x + 1
+        directions = []
+        if maze[i + self.stride]:
+            directions.append('N')
+        if maze[i - 1]:
+            directions.append('W')
+        if maze[i + 1]:
+            directions.append('E')
+        if maze[i - self.stride]:
+            directions.append('S')
+        return directions
+
+    def count_touching_paths(self, x, y):
+        """Returns how many of the spaces touching (x, y) are paths."""
+        maze = self.maze
+        i = (y + 1) * self.stride + x + 1
+        return maze[i + self.stride] + maze[i - 1] + maze[i + 1] + maze[i - self.stride]
+
+    def padded_array(self):
+        """Returns a numpy view of self.maze (not a copy) of shape (height + 2, width + 2)."""
+        return np.frombuffer(self.maze, dtype=np.uint8).reshape(self.height + 2, self.stride)
+
+    def make_paths(self, indexes):
+        """Makes the spaces at the given indexes (y * width + x) paths, in one assignment with numpy."""
+        if np is None:
+            super().make_paths(indexes)
+            return
+        indexes = np.asarray(indexes, dtype=np.int64)
+        # the border adds 2 spaces to every row before the index, and a row and a space before the first one
+        np.frombuffer(self.maze, dtype=np.uint8)[indexes + 2 * (indexes // self.width) + self.stride + 1] = 1
+
+
+class BitMaze(Maze):
+    """Maze stored in a bytearray with one bit per space and a border of walls.
+
+    Spaces are numbered row by row with a one space wall border around the maze (the same layout as
+    ByteMaze), so space (x, y) is i = (y + 1) * stride + x + 1 and lives in bit i & 7 of byte i >> 3.
+    This is the most compact storage, at the cost of a few bit operations per access.
+
+    Methods:
+        __len__ - Override for python len().
+        make_base_grid - Sets up self.maze as a packed, padded bytearray based on x and y dimensions.
+        get_maze - Returns maze as a list of columns (same format as Maze.get_maze).
+        is_path - Returns if space defined by x and y is a path.
+        make_path - Makes the space defined by x and y a path.
+        make_wall - Makes the space defined by x and y a wall.
+        padded_array - Returns the maze as a numpy array with a border of walls.
+    """
+    def __len__(self):
+        """Override for python len()."""
+        return self.width
+
+    def make_base_grid(self, walls):
+        """Sets up self.maze as a packed, padded bytearray based on x and y dimensions.
+
+        Args:
+            walls - make all spaces in the grid walls, False = make all spaces paths
+        """
+        self.stride = self.width + 2
+        self.maze = bytearray((self.stride * (self.height + 2) + 7) >> 3)
+        if not walls:
+            for x in range(self.width):
+                for y in range(self.height):
+                    self.make_path(x, y)
+
+    def get_maze(self):
+        """Returns maze as a list of columns (same format as Maze.get_maze)."""
+        return [[self.is_path(x, y) for y in range(self.height)] for x in range(self.width)]
+
+    def is_path(self, x, y):
+        """Returns if space defined by x and y is a path."""
+        i = (y + 1) * self.stride + x + 1
+        return (self.maze[i >> 3] >> (i & 7)) & 1
+
+    def make_path(self, x, y):
+        """Makes the space defined by x and y a path."""
+        i = (y + 1) * self.stride + x + 1
+        self.maze[i >> 3] |= 1 << (i & 7)
+
+    def make_wall(self, x, y):
+        """Makes the space defined by x and y a wall."""
+        i = (y + 1) * self.stride + x + 1
+        self.maze[i >> 3] &= 0xff ^ (1 << (i & 7))
+
+    def padded_array(self):
+        """Returns the maze as a numpy array with a border of walls."""
+        # unpackbits is most significant bit first, so flip each byte's bits to get space order
+        bits = np.unpackbits(np.frombuffer(self.maze, dtype=np.uint8)).reshape(-1, 8)[:, ::-1].ravel()
+        return bits[:self.stride * (self.height + 2)].reshape(self.height + 2, self.stride)
+
+
+class NumpyMaze(Maze):
+    """Maze stored in a numpy uint8 array with a border of walls.
+
+    The space (x, y) lives at self.maze[y + 1, x + 1].  Single spaces are slow to access through numpy,
+    but every whole-grid query (path_masks, neighbour_counts, to_array, get_cells, set_cells) works
+    directly on the array without copying it.
+
+    Methods:
+        __len__ - Override for python len().
+        make_base_grid - Sets up self.maze as a padded numpy array based on x and y dimensions.
+        get_maze - Returns maze as a list of columns (same format as Maze.get_maze).
+        is_path - Returns if space defined by x and y is a path.
+        make_path - Makes the space defined by x and y a path.
+        make_wall - Makes the space defined by x and y a wall.
+        padded_array - Returns the maze array itself (not a copy).
+        get_cells - Returns a numpy boolean array of whether each of the given spaces is a path.
+        set_cells - Makes all the given spaces paths (or walls).
+        make_paths - Makes the spaces at the given indexes (y * width + x) paths.
+    """
+    def __len__(self):
+        """Override for python len()."""
+        return self.width
+
+    def make_base_grid(self, walls):
+        """Sets up self.maze as a padded numpy array based on x and y dimensions.
+
+        Args:
+            walls - make all spaces in the grid walls, False = make all spaces paths
+        """
+        self.maze = np.zeros((self.height + 2, self.width + 2), dtype=np.uint8)
+        if not walls:
+            self.maze[1:-1, 1:-1] = 1
+
+    def get_maze(self):
+        """Returns maze as a list of columns (same format as Maze.get_maze)."""
+        return self.maze[1:-1, 1:-1].T.tolist()
+
+    def is_path(self, x, y):
+        """Returns if space defined by x and y is a path."""
+        return self.maze.item(y + 1, x + 1)
+
+    def make_path(self, x, y):
+        """Makes the space defined by x and y a path."""
+        self.maze[y + 1, x + 1] = 1
+
+    def make_wall(self, x, y):
+        """Makes the space defined by x and y a wall."""
+        self.maze[y + 1, x + 1] = 0
+
+    def padded_array(self):
+        """Returns the maze array itself (not a copy)."""
+        return self.maze
+
+    def get_cells(self, xs, ys):
+        """Returns a numpy boolean array of whether each of the given spaces is a path."""
+        return self.maze[np.asarray(ys) + 1, np.asarray(xs) + 1] != 0
+
+    def set_cells(self, xs, ys, path=True):
+        """Makes all the given spaces paths (or walls if path is False)."""
+        self.maze[np.asarray(ys) + 1, np.asarray(xs) + 1] = 1 if path else 0
+
+    def make_paths(self, indexes):
+        """Makes the spaces at the given indexes (y * width + x) paths."""
+        indexes = np.asarray(indexes, dtype=np.int64)
+        ys, xs = indexes // self.width, indexes % self.width
+        self.maze[ys + 1, xs + 1] = 1
+
+
+# storage backends that can be passed to the generators as 'storage'
+MAZE_TYPES = {'LIST': Maze, 'BYTES': ByteMaze, 'BITS': BitMaze}
+if np is not None:
+    MAZE_TYPES['NUMPY'] = NumpyMaze
+
+
+def convert_maze(maze, storage):
+    """Returns the maze stored as MAZE_TYPES[storage] (the same maze if it already is)."""
+    maze_type = MAZE_TYPES[storage]
+    if type(maze) is maze_type:
+        return maze
+
+    converted = maze_type(maze.width, maze.height)
+    if maze_type is NumpyMaze:
+        converted.maze[:] = maze.padded_array()
+        return converted
+
+    for x, column in enumerate(maze.get_maze()):
+        for y, path in enumerate(column):
+            if path:
+                converted.make_path(x, y)
+    return converted
+
+
+class CellList(list):
+    """Frontier of cells in a plain list, removing by index is list.pop (O(1) from the end, like a stack)."""
+    def remove_index(self, index):
+        """Removes the cell at index."""
+        self.pop(index)
+
+
+class CellQueue(deque):
+    """Frontier of cells in a deque, removing the first cell is O(1) (for breadth-first)."""
+    def remove_index(self, index):
+        """Removes the cell at index."""
+        if index == 0:
+            self.popleft()
+        else:
+            del self[index]
+
+
+class CellBag(list):
+    """Frontier of cells where order doesn't matter, any cell is removed in O(1) (for random choice).
+
+    The last cell is moved into the removed cell's place, so only use this when the cells are chosen
+    by an index that doesn't depend on the order (e.g. uniformly at random).
+    """
+    def remove_index(self, index):
+        """Removes the cell at index."""
+        last = self.pop()
+        if index < len(self):
+            self[index] = last
+
 
 class OrthogonalMaze:
     """Flexible and powerful grid-based maze generation class.
 
+    The cells that can still grow are kept in self.cells, which is a frontier_type.  Subclasses pick the
+    frontier that makes removing the index returned by choose_ind cheapest.
+
     Methods:
         __init__ - Initializes variables, creates maze grid, starts progress report, makes maze, ends progress report.
-        make - Makes a maze.
+        make - Makes the whole maze.
+        make_steps - Makes a maze, yielding after every step.
+        start_progress - Starts the Blender progress report or the terminal display.
+        iter_make - Makes the maze a few steps at a time (for mazes made with defer).
+        make_with_checkpoints - Makes the maze, saving checkpoints to resume from if it's stopped.
+        save_checkpoint - Saves the state of the maze being made (see load_checkpoint).
+        finish_make - Stores the finished maze and ends the progress report.
         start_location - Generates random, even x and y values.
         get_directions - Returns a list of the spaces from 4 directions 2 spaces from given ordered pair.
         dir_to_ordered_pair - Returns ordered pair of direction.
@@ -221,9 +838,22 @@ class OrthogonalMaze:
         get - Returns maze.
         display - Prints maze to terminal or console window.
     """
+    frontier_type = CellList
+
+    def __init__(self, debug, width=10, height=10, storage='BYTES', show_progress=True, seed=None, rng=None,
+                 defer=False):
+        """Initializes variables, creates maze grid, starts progress report, makes maze, ends progress report.
 
-    def __init__(self, debug, width=10, height=10):
-        """Initializes variables, creates maze grid, starts progress report, makes maze, ends progress report."""
+        Args:
+            debug - (boolean) debug mode (no console progress bar)
+            width - (int) width of the maze
+            height - (int) height of the maze
+            storage - (string) key of MAZE_TYPES to choose how the finished maze is stored
+            show_progress - (boolean) show the Blender progress or the terminal display while generating
+            seed - (int) makes the same maze every time it's used (see make_rng), None = use the random module
+            rng - (random.Random) generator to draw every random number from, overrides seed
+            defer - (boolean) don't make the maze yet, it's made by running iter_make instead
+        """
         global IN_BLENDER
         self.IN_BLENDER = IN_BLENDER
 
@@ -233,30 +863,177 @@ class OrthogonalMaze:
         self.debug = debug
         self.width = width
         self.height = height
-
-        self.maze = Maze(width, height)
-        self.cells = []
+        self.show_progress = show_progress
+        self.storage = storage
+        self.seed = seed
+        self.rng = make_rng(seed) if rng is None else rng
+
+        # generate on the padded ByteMaze so touching spaces can be read without bounds checks
+        self.maze = ByteMaze(width, height)
+        self.cells = self.frontier_type()
         self.loops = 0
-        self.estimated_loops = int((self.width * self.height * 1.25))
+        self.estimated_loops = self.estimate_loops()
 
-        if self.IN_BLENDER:
-            self.bldr_prog = BlenderProgress("Layout Gen", self.debug)
+        self.start_progress()
+
+        if not defer:
+            self.make()
+            self.finish_make()
+
+    def checkpoint_kwargs(self):
+        """Returns the keyword arguments to make the generator again from a checkpoint (see load_checkpoint)."""
+        return {}
+
+    def checkpoint_state(self):
+        """Returns the state of the maze being made for save_checkpoint, subclasses add their own to it.
+
+        Returns:
+            values - (dict) numbers and strings that can be written as JSON
+            arrays - {name: array.array, ...} the grid (packed into bits), the frontier...
+        """
+        # a generator of the random module's stream continues it (see load_checkpoint)
+        version, internal_state, gauss_next = self.rng.getstate()
+        values = {'loops': self.loops, 'rng': [version, list(internal_state), gauss_next]}
+        arrays = {'maze': array('B', pack_bits(self.maze.maze)), 'cells': self.pack_cells()}
+        return values, arrays
+
+    def restore_state(self, values, arrays):
+        """Puts back the state from checkpoint_state (see load_checkpoint)."""
+        maze = unpack_bits(arrays['maze'].tobytes())
+        if len(maze) != len(self.maze.maze):
+            raise ValueError("The checkpoint's grid doesn't fit a {}x{} maze".format(self.width, self.height))
+        self.maze.maze = maze
+        self.cells = self.unpack_cells(arrays['cells'])
+        self.loops = values['loops']
+        version, internal_state, gauss_next = values['rng']
+        self.rng.setstate((version, tuple(internal_state), gauss_next))
+
+    def pack_cells(self):
+        """Returns the cells that can still grow as an array, x and y one after the other."""
+        return array('q', [n for cell in self.cells for n in cell])
+
+    def unpack_cells(self, cells):
+        """Returns the frontier of the cells from pack_cells."""
+        return self.frontier_type(zip(cells[::2], cells[1::2]))
+
+    def start_progress(self):
+        """Starts the Blender progress report or the terminal display (if show_progress is on)."""
+        if self.IN_BLENDER and self.show_progress:
+            self.bldr_prog = BlenderProgress("Layout Gen", self.debug, throttle=True)
+            self.bldr_prog.set_total(self.estimated_loops)
             self.bldr_prog.start()
+            # a resumed maze carries on from where it was
+            self.bldr_prog.tick(self.loops)
+        elif self.show_progress:
+            self.terminal = TerminalDisplay(self.width, self.height)
+
+    def make(self):
+        """Makes the whole maze (see make_steps)."""
+        if not self.show_progress:
+            # nothing to update, so run through the steps without a python loop
+            deque(self.make_steps(), maxlen=0)
+            return
 
-        self.make()
+        loop_update = self.loop_update
+        for _ in self.make_steps():
+            loop_update()
 
-        if self.IN_BLENDER:
+    def iter_make(self, steps=1000, checkpoint_path=None, interval=60.0):
+        """Makes the maze a few steps at a time (for mazes made with defer).
+
+        Yields how many steps have been made after every steps steps, and once more when the maze is finished
+        and stored (see finish_make), so a caller can stop and pick up again between any two yields.
+
+        With a checkpoint_path, a checkpoint to resume from is saved before a yield once it's due (see
+        make_with_checkpoints) and deleted once the maze is finished.
+        """
+        loop_update = self.loop_update
+        wait = interval
+        last_save = time()
+        done = 0
+        for _ in self.make_steps():
+            loop_update()
+            done += 1
+            if not done % steps:
+                if checkpoint_path and time() - last_save >= wait:
+                    save_start = time()
+                    self.save_checkpoint(checkpoint_path)
+                    last_save = time()
+                    wait = max(interval, 50 * (last_save - save_start))
+                yield done
+        self.finish_make()
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        yield done
+
+    def make_with_checkpoints(self, path, interval=60.0, steps=1000):
+        """Makes the maze (for mazes made with defer), saving checkpoints to path to resume from if it's stopped.
+
+        Checkpoints are at least interval seconds apart and at least 50 times as long apart as the last save
+        took, so saving costs under 2% of the time however big the maze is.  The checkpoint is deleted once
+        the maze is finished.
+
+        Args:
+            path - (string) file to save the checkpoints to (see save_checkpoint)
+            interval (optional) - (float) least number of seconds between checkpoints
+            steps (optional) - (int) steps between checks of the time
+        """
+        deque(self.iter_make(steps, path, interval), maxlen=0)
+
+    def save_checkpoint(self, path):
+        """Saves the state of the maze being made to path (see load_checkpoint).
+
+        Only call this between the steps of make_steps.  The file is CHECKPOINT_MAGIC, the length of a JSON
+        header (4 bytes, little endian), the header and then the bytes of every array it lists.  The header has
+        the format version, the generator's class name, size and settings and the values of checkpoint_state.
+        The state is written to a file next to path and then renamed over it, so a crash while saving still
+        leaves the last checkpoint whole.
+        """
+        values, arrays = self.checkpoint_state()
+        header = {'version': CHECKPOINT_VERSION,
+                  'generator': type(self).__name__,
+                  'width': self.width,
+                  'height': self.height,
+                  'storage': self.storage,
+                  'seed': self.seed,
+                  'debug': self.debug,
+                  'kwargs': self.checkpoint_kwargs(),
+                  'values': values,
+                  'byteorder': sys.byteorder,
+                  'arrays': [[name, a.typecode, len(a) * a.itemsize] for name, a in sorted(arrays.items())]}
+        header = json.dumps(header).encode('utf-8')
+
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(CHECKPOINT_MAGIC)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            for name, a in sorted(arrays.items()):
+                f.write(a.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def finish_make(self):
+        """Stores the finished maze as self.storage and ends the progress report."""
+        self.maze = convert_maze(self.maze, self.storage)
+
+        if not self.show_progress:
+            pass
+        elif self.IN_BLENDER:
             self.bldr_prog.finish()
         else:
-            self.display()
+            self.terminal.finish(self.maze)
 
-    def make(self):
-        """Makes a maze. Only a stub."""
+    def make_steps(self):
+        """Makes a maze, yielding after every step. Only a stub."""
 
-        # generate random, but even x and y start location
-        x, y = self.start_location()
-        self.cells.append((x, y))
-        self.maze.make_path(x, y)
+        if not self.cells:
+            # not resuming from a checkpoint, generate random, but even x and y start location
+            x, y = self.start_location()
+            self.cells.append((x, y))
+            self.maze.make_path(x, y)
 
         while self.cells:
             index = self.choose_ind()
@@ -266,11 +1043,12 @@ class OrthogonalMaze:
             directions = self.shuffle_directions(directions)
             for dx, dy in directions:
 
-                # check that we're not by more than 1 path cell
-                if self.limited_paths_check((dx, dy), 1):
+                # the border only covers touching spaces, so spaces 2 away still need exist_test
+                if not self.maze.exist_test(dx, dy) or self.maze.is_path(dx, dy):
                     continue
 
-                if self.maze.exist_test(dx, dy) and not self.maze.is_path(dx, dy):
+                # check that we're not by more than 1 path cell
+                if not self.limited_paths_check((dx, dy), 1):
                     # space in between b/c we are doing doubles
                     self.maze.make_path(round_avg(x, dx), round_avg(y, dy))
                     # space (second one)
@@ -281,16 +1059,17 @@ class OrthogonalMaze:
 
             # remove from cells list if index has not been found
             if index is not None:
-                self.cells.pop(index)
+                self.cells.remove_index(index)
 
-            self.loop_update()
+            yield
 
     def start_location(self):
         """Generates random, even x and y values."""
-        return random.randint(0, int((self.width - 1) / 2)) * 2, random.randint(0, int((self.height - 1) / 2)) * 2
+        rng = self.rng
+        return rng.randint(0, int((self.width - 1) / 2)) * 2, rng.randint(0, int((self.height - 1) / 2)) * 2
 
     def shuffle_directions(self, directions):
-        return random.shuffle(directions)
+        return self.rng.shuffle(directions)
 
     @staticmethod
     def get_directions(x, y):
@@ -306,14 +1085,20 @@ class OrthogonalMaze:
         except KeyError:
             logger.error("Error! Invalid direction!")
 
+    def estimate_loops(self):
+        """Returns about how many times make will call loop_update."""
+        return int((self.width * self.height * 1.25))
+
     def loop_update(self, sleep_time=0.0):
         """Updates progress reports."""
+        if not self.show_progress:
+            return
         if self.IN_BLENDER:
             self.loops += 1
-            progress = self.loops / self.estimated_loops
-            self.bldr_prog.update(progress)
+            self.bldr_prog.tick()
         else:
-            self.display()
+            # only redraws the changed spaces, and at most 30 times a second
+            self.terminal.draw(self.maze)
             if sleep_time:
                 sleep(sleep_time)
 
@@ -323,7 +1108,7 @@ class OrthogonalMaze:
 
     def limited_paths_check(self, space, max_allowed):
         """Returns True if space is neighboring more than max_allowed spaces, False otherwise."""
-        return len(self.paths_only(self.maze.find_exist_touching(space[0], space[1]))) > max_allowed
+        return self.maze.count_touching_paths(space[0], space[1]) > max_allowed
 
     def choose_ind(self):
         """Chooses index...only a stub."""
@@ -345,33 +1130,8 @@ class OrthogonalMaze:
 
     def display(self, illum_list=()):
         """Prints maze to terminal or console window."""
-        # x-axis labels
-        tens_digit = [str([b for b in range(10)][int(a / 10)]) for a in range(self.width)]
-        disp = "    " + "".join(tens_digit).replace("0", " ") + "\n"
-        ones_digit = [str([b for b in range(10)][a % 10]) for a in range(self.width)]
-        disp += "    " + "".join(ones_digit) + "\n"
-        # x-axis arrows
-        disp += "   " + "v" * (self.width + 2) + "\n"
-
-        for y in range(self.height):
-            # y-axis labels and arrows
-            disp += "{:2d}".format(y) + " >"
-            for x in range(self.width):
-                # illuminated are shown with '$'
-                if (x, y) in illum_list:
-                    disp += "$"
-                # paths are shown with ' '
-                elif self.maze.is_path(x, y):
-                    disp += " "
-                # walls are shown with '#'
-                else:
-                    disp += "\u2588"
-            # right-hand y-axis arrows and newlines
-            disp += "<\n"
-
-        # bottom x-axis arrows
-        disp += "   " + "^" * (self.width + 2)
-        print(disp)
+        # illuminated are shown with '$', paths with ' ' and walls with '\u2588'
+        print(maze_text(maze_rows(self.maze, self.width, self.height, illum_list), self.width))
 
 
 class PassageCarverMaze(OrthogonalMaze):
@@ -380,26 +1140,118 @@ class PassageCarverMaze(OrthogonalMaze):
 
 
 class GraphTheoryMaze(PassageCarverMaze):
+    """Growing tree mazes (depth-first, breadth-first, Prim's...) that can be biased along an axis.
+
+    make is a carving kernel that works on indexes into the padded ByteMaze: the frontier holds ints and
+    the 4 moves are precomputed index offsets, so no lists or tuples are made per carved space.
+    """
     def __init__(self, bias_direction, bias, **kwargs):
         self.bias_direction = bias_direction
         self.bias = bias
+        self.order_table = None
         super().__init__(**kwargs)
 
-    def shuffle_directions(self, directions):
+    def make_steps(self):
+        """Makes a maze by growing a tree from a random start, choosing which cell to grow with choose_ind."""
+        maze = self.maze.maze
+        stride = self.maze.stride
+        cells = self.cells
+        choose_ind = self.choose_ind
+        rand = self.rng.random
+
+        # the same moves as get_directions: (x + 2, y), (x - 2, y), (x, y + 2), (x, y - 2)
+        steps = (1, -1, stride, -stride)
+
+        # one random number picks the order to try the moves in (see permutation_table)
+        running_sums, orders = self.permutation_table()
+        orders = [tuple(steps[i] for i in order) for order in orders]
+
+        # the border is marked 2 while carving so moves off the maze stop at it...it's cleared at the end
+        self.maze.clear_border(2)
+
+        if not cells:
+            # not resuming from a checkpoint, generate random, but even x and y start location
+            x, y = self.start_location()
+            start = self.maze.index(x, y)
+            maze[start] = 1
+            cells.append(start)
+
+        while cells:
+            index = choose_ind()
+            cell = cells[index]
+
+            for step in orders[bisect_right(running_sums, rand())]:
+                # the space in between is only 0 inside the maze and when the space past it could be new
+                between = cell + step
+                if not maze[between] and not maze[between + step]:
+                    maze[between] = 1
+                    maze[between + step] = 1
+                    cells.append(between + step)
+                    break
+            else:
+                # remove from cells list if no new space was found
+                cells.remove_index(index)
+
+            yield
+
+        self.maze.clear_border()
+
+    def checkpoint_kwargs(self):
+        # the axis is picked by the time there's anything to save, so the same one is used again
+        return {'bias_direction': self.bias_direction, 'bias': self.bias}
+
+    def pack_cells(self):
+        # the cells are already indexes
+        return array('q', self.cells)
+
+    def unpack_cells(self, cells):
+        return self.frontier_type(cells)
+
+    def ordered_pair(self, index):
+        """Returns the ordered pair of passed index."""
+        y, x = divmod(self.cells[index], self.maze.stride)
+        return x - 1, y - 1
+
+    def direction_weights(self):
+        """Returns the bias weights of the moves from get_directions (picks an axis when it is random)."""
         choices = ['X', 'Y']
         if self.bias_direction not in choices:
-            self.bias_direction = random.choice(choices)
+            self.bias_direction = self.rng.choice(choices)
 
         if self.bias_direction == 'X':
-            w_dirs = list(zip(directions, [0, 0, 1, 1]))
+            return [0, 0, 1, 1]
         elif self.bias_direction == 'Y':
-            w_dirs = list(zip(directions, [1, 1, 0, 0]))
+            return [1, 1, 0, 0]
         else:
-            w_dirs = list(zip(directions, [1, 1, 1, 1]))
-        return weira.weira_shuffle(w_dirs, self.bias)
+            return [1, 1, 1, 1]
+
+    def permutation_table(self):
+        """Returns the orders weira_shuffle can put the 4 moves in with this bias and when to pick each one.
+
+        The chance of every order is worked out once (see weira.shuffle_permutations), so picking an order is
+        one random number and a binary search of the running sums instead of 4 random numbers and a sort.
+
+        Returns:
+            running_sums - [running sum of the chances of the orders, ...], the first sum past random() is
+                the order to pick
+            orders - [(indexes of the directions from get_directions, in the order to try them), ...]
+        """
+        if self.order_table is None:
+            table = weira.shuffle_permutations(self.direction_weights(), self.bias)
+            running_sums = list(accumulate(chance for order, chance in table))
+            # random() is always below 1, this keeps rounding errors from making it miss the last sum
+            running_sums[-1] = 1.0
+            self.order_table = running_sums, [order for order, chance in table]
+        return self.order_table
+
+    def shuffle_directions(self, directions):
+        running_sums, orders = self.permutation_table()
+        return [directions[i] for i in orders[bisect_right(running_sums, self.rng.random())]]
 
 
 class BreadthFirstMaze(GraphTheoryMaze):
+    frontier_type = CellQueue
+
     def choose_ind(self):
         return 0
 
@@ -410,8 +1262,10 @@ class DepthFirstMaze(GraphTheoryMaze):
 
 
 class PrimsMaze(GraphTheoryMaze):
+    frontier_type = CellBag
+
     def choose_ind(self):
-        return random.randint(0, len(self.cells) - 1)
+        return self.rng.randint(0, len(self.cells) - 1)
 
 
 class BinaryTreeMaze(PassageCarverMaze):
@@ -427,28 +1281,52 @@ class BinaryTreeMaze(PassageCarverMaze):
         elif directions == 'SW':
             self.directions = ['S', 'W']
         else:
-            possible_dirs = [['N', 'E'], ['N', 'W'], ['S', 'E'], ['S', 'W']]
-            self.directions = random.choice(possible_dirs)
+            # picked in make, once there is an rng
+            self.directions = None
 
         self.tileable = tileable
+        # how many lattice spaces are done (column by column), so a checkpoint can carry on from there
+        self.position = 0
 
         super().__init__(**kwargs)
 
-    def make(self):
-        # start in top, left corner
-        for x in range(self.width)[::2]:
-            for y in range(self.height)[::2]:
+    def checkpoint_kwargs(self):
+        directions = 'RANDOM' if self.directions is None else ''.join(self.directions)
+        return {'directions': directions, 'tileable': self.tileable}
+
+    def checkpoint_state(self):
+        values, arrays = super().checkpoint_state()
+        values['position'] = self.position
+        return values, arrays
+
+    def restore_state(self, values, arrays):
+        super().restore_state(values, arrays)
+        self.position = values['position']
+
+    def make_steps(self):
+        if self.directions is None:
+            possible_dirs = [['N', 'E'], ['N', 'W'], ['S', 'E'], ['S', 'W']]
+            self.directions = self.rng.choice(possible_dirs)
+
+        rng = self.rng
+        maze = self.maze.maze
+        # index offsets of the touching spaces (same directions as dir_to_ordered_pair)
+        offsets = {'N': -self.maze.stride, 'E': 1, 'S': self.maze.stride, 'W': -1}
+
+        # start in top, left corner (or where the checkpoint was saved)
+        column, row = divmod(self.position, (self.height + 1) // 2)
+        for x in range(2 * column, self.width, 2):
+            for y in range(2 * row, self.height, 2):
+                i = self.maze.index(x, y)
+                maze[i] = 1
 
                 d = ''
                 # this controls how we handle the edges
                 if self.tileable:
-                    self.maze.make_path(x, y)
-                    d = random.choice(self.directions)
+                    d = rng.choice(self.directions)
                 else:
                     temp_directions = []
 
-                    self.maze.make_path(x, y)
-
                     # y-axis
                     if y > 0 and 'N' in self.directions:
                         temp_directions += 'N'
@@ -463,29 +1341,33 @@ class BinaryTreeMaze(PassageCarverMaze):
 
                     # choose direction
                     if temp_directions:
-                        d = random.choice(temp_directions)
+                        d = rng.choice(temp_directions)
                 if d:
-                    nx, ny = self.dir_to_ordered_pair(x, y, d, 1)
-                    if self.maze.exist_test(nx, ny):
-                        self.maze.make_path(nx, ny)
+                    # may carve into the border when tileable...it is cleared below instead of bounds checking
+                    maze[i + offsets[d]] = 1
+
+                self.position += 1
+                yield
+            row = 0
 
-                self.loop_update()
+        self.maze.clear_border()
 
 
 class SetBasedMaze(OrthogonalMaze):
+    """Mazes that carve by joining sets of path spaces, so they never have to check for loops."""
     def __init__(self, **kwargs):
-        self.tree = Tree()
         super().__init__(**kwargs)
 
-    def knock_out_wall(self, x1, x2):
-        self.maze.make_path(round(avg(x1, x2)), self.y)
-
 
 class KruskalsMaze(PassageCarverMaze, SetBasedMaze):
     def __init__(self, **kwargs):
+        # the shuffled walls and how many of them are done, kept here so a checkpoint can carry on from there
+        self.walls = None
+        self.position = 0
+        self.sets = None
         super().__init__(**kwargs)
 
-    def make(self):
+    def make_steps(self):
         """Relies on odd dimensions:
 
         +-------------------+
@@ -507,132 +1389,353 @@ class KruskalsMaze(PassageCarverMaze, SetBasedMaze):
 
         """
 
-        # create the tree and carve out the 0's
-        self.tree = Tree()
-        for x in range(self.width)[::2]:
-            for y in range(self.height)[::2]:
-                self.tree.new_node((x, y))
-                self.maze.make_path(x, y)
-
-        # create a list of all the walls
-        walls = []
-        for y in range(self.height):
+        lattice_width = (self.width + 1) // 2
+        lattice_height = (self.height + 1) // 2
+        if self.walls is None:
+            # carve out the 0's, each one starts in a set of its own (numbered across then up the lattice)
+            self.sets = DisjointSet(lattice_width * lattice_height)
             for x in range(self.width)[::2]:
-                if y & 1:
-                    walls.append((x, y))
-                else:
-                    if x + 1 < self.width:
-                        walls.append((x + 1, y))
-
-        random.shuffle(walls)
-
-        while walls:
-            w = walls.pop()
-            # if the wall's y-value is odd, the paths will be up and down
-            if w[1] & 1:
-                if self.tree.get_root((w[0], w[1] + 1)) != self.tree.get_root((w[0], w[1] - 1)):
-                    self.maze.make_path(w[0], w[1])
-                    # parent the roots of the two path spaces to each other
-                    self.tree.parent(self.tree.get_root((w[0], w[1] + 1)), self.tree.get_root((w[0], w[1] - 1)))
+                for y in range(self.height)[::2]:
+                    self.maze.make_path(x, y)
+
+            self.walls = self.lattice_walls(lattice_width, lattice_height)
+            self.shuffle_walls(self.walls, self.rng)
+
+        sets = self.sets
+        walls = self.walls
+        for position in range(self.position, len(walls)):
+            wall = walls[position]
+            cell = wall >> 1
+            y, x = divmod(cell, lattice_width)
+            # walls with the low bit set are between a cell and the one above it
+            if wall & 1:
+                joined = sets.union(cell, cell + lattice_width)
+                y = 2 * y + 1
+                x = 2 * x
             else:
-                if self.tree.get_root((w[0] + 1, w[1])) != self.tree.get_root((w[0] - 1, w[1])):
-                    self.maze.make_path(w[0], w[1])
-                    self.tree.parent(self.tree.get_root((w[0] + 1, w[1])), self.tree.get_root((w[0] - 1, w[1])))
+                joined = sets.union(cell, cell + 1)
+                y = 2 * y
+                x = 2 * x + 1
 
-            self.loop_update()
+            # only knock out walls between different sets, otherwise we would introduce a loop
+            if joined:
+                self.maze.make_path(x, y)
+
+            self.position = position + 1
+            yield
+
+        # the walls take up more memory than the maze, let them go
+        self.walls = array('i')
+
+    def checkpoint_state(self):
+        values, arrays = super().checkpoint_state()
+        values['started'] = self.walls is not None
+        if self.walls is not None:
+            # only the walls left to do are needed to carry on
+            arrays['walls'] = self.walls[self.position:]
+            arrays['parents'] = self.sets.parents
+            arrays['ranks'] = array('B', self.sets.ranks)
+            values['num_sets'] = self.sets.num_sets
+        return values, arrays
+
+    def restore_state(self, values, arrays):
+        super().restore_state(values, arrays)
+        if values['started']:
+            self.walls = arrays['walls']
+            self.position = 0
+            self.sets = DisjointSet()
+            self.sets.parents = arrays['parents']
+            self.sets.ranks = bytearray(arrays['ranks'].tobytes())
+            self.sets.num_sets = values['num_sets']
+
+    @staticmethod
+    def lattice_walls(lattice_width, lattice_height):
+        """Returns an array of every wall between two lattice cells.
+
+        A wall is encoded as 2 * cell + 1 for the wall above cell and 2 * cell for the wall to its right, where
+        cell = lattice_y * lattice_width + lattice_x, so the whole list is one int array instead of tuples.
+        """
+        walls = array('i')
+        for row in range(lattice_height):
+            first = row * lattice_width
+            # right walls of every cell but the last in the row
+            walls.extend(range(2 * first, 2 * (first + lattice_width - 1), 2))
+            # walls above every cell in the row but the top one
+            if row < lattice_height - 1:
+                walls.extend(range(2 * first + 1, 2 * (first + lattice_width), 2))
+        return walls
+
+    @staticmethod
+    def shuffle_walls(walls, rng=random):
+        """Shuffles the wall array in place (with numpy if it's available, seeded from rng)."""
+        if np is None:
+            rng.shuffle(walls)
+        else:
+            # a view of the same buffer, so numpy shuffles the array itself...RandomState (not default_rng) is in
+            # every numpy version, including the old ones bundled with Blender 2.7x
+            np.random.RandomState(rng.getrandbits(32)).shuffle(np.frombuffer(walls, dtype=walls.typecode))
 
 
 class EllersMaze(PassageCarverMaze, SetBasedMaze):
+    """Eller's algorithm, builds the maze one row at a time (see ellers_rows for the rows without a grid)."""
     def __init__(self, bias=0.0, **kwargs):
         self.bias = bias
-        self.y = 0
+        # the sets of the current row (see ellers_state), kept here so a checkpoint can carry on from there
+        self.row_state = None
         super().__init__(**kwargs)
 
-    def make(self):
-        # create all nodes we will ever need to use (we only build one row at a time)
-        for a in range(self.width)[::2]:
-            self.tree.new_node(name=a)
-
-        # make all of these paths
-        for x in self.tree.get_nodes():
-            self.maze.make_path(x, 0)
-
-        # loop over every other y-value so if height = 5 we loop: 0, 2, 4 as y
-        for y in range(self.height)[::2]:
-            self.y = y  # update here so we don't have to keep passing it as an arg
-
-            # combine sets - use bias
-            for node in self.tree.get_nodes():
-                neighbor = node + 2
-
-                # this must be tried b/c neighbor +2 (so out of range of keys)...dict is
-                # unordered so we can't use slicing to skip the last one :(
-                try:
-                    # if they are already the same set type we would introduce a loop
-                    if self.tree.get_root(node) == self.tree.get_root(neighbor):
-                        continue
-                except KeyError:
-                    continue
-
-                if random.random() > 1 - (1 - self.bias) and y < self.height - 1:
-                    self.combine_sets(node, neighbor)
-
-                self.loop_update()
-
-            # drop down sets - use drop_down_chance?
-            if y < self.height - 1:
-                self.drop_down()
-
-        # knock out walls in the bottom row to remove isolated regions
-        self.finish_bottom()
-
-    def combine_sets(self, x1, x2):
-        # self.tree.unparent(x2)
-        root = self.tree.get_root(x2)
-        self.tree.parent(root, x1)
-
-        # knock out wall between on maze
-        self.knock_out_wall(x1, x2)
-
-    def drop_down(self):
-        def drop(x):
-            if self.maze.exist_test(x, self.y + 1):
-                self.maze.make_path(x, self.y + 1)
-                self.maze.make_path(x, self.y + 2)
-            return x
-
-        dropped = []
-        for root in self.tree.get_roots():
-            nodes_on_rt = [a for a in self.tree.get_nodes() if self.tree.child_of(a, root)] + [root]
-            # drop AT LEAST one from each 'root'...
-            for _ in nodes_on_rt:
-                dropped.append(drop(random.choice(nodes_on_rt)))
-
-        # make the rest become roots
-        for leaf in self.tree.get_nodes():
-            if leaf not in dropped:
-                self.tree.replacement_child_shift_detach(leaf)
-                self.maze.make_path(leaf, self.y + 2)
-
-    def finish_bottom(self):
-        for node in self.tree.get_nodes():
-            neighbor = node + 2
-            # this must be tried b/c neighbor +2 (so out of range of keys)...dict is
-            # unordered so we can't use slicing to skip the last one :(
-            try:
-                if self.tree.get_root(node) != self.tree.get_root(neighbor):
-                    self.combine_sets(node, neighbor)
-            except KeyError:
+    def estimate_loops(self):
+        # progress is reported once per row
+        return self.height
+
+    def checkpoint_kwargs(self):
+        return {'bias': self.bias}
+
+    def checkpoint_state(self):
+        values, arrays = super().checkpoint_state()
+        values['started'] = self.row_state is not None
+        if self.row_state is not None:
+            state = self.row_state
+            values['rows'] = state['rows']
+            arrays['labels'] = state['labels']
+            # the members of every set one after the other, split again by their sizes
+            arrays['members'] = array('i', [x for members in state['members'] for x in members])
+            arrays['sizes'] = array('i', [len(members) for members in state['members']])
+            arrays['free_labels'] = array('i', state['free_labels'])
+        return values, arrays
+
+    def restore_state(self, values, arrays):
+        super().restore_state(values, arrays)
+        if values['started']:
+            members = arrays['members']
+            all_members = []
+            start = 0
+            for size in arrays['sizes']:
+                all_members.append(members[start:start + size].tolist())
+                start += size
+            self.row_state = {'rows': values['rows'],
+                              'labels': arrays['labels'],
+                              'members': all_members,
+                              'free_labels': arrays['free_labels'].tolist()}
+
+    def make_steps(self):
+        if self.row_state is None:
+            self.row_state = ellers_state(self.width)
+        state = self.row_state
+        for row in ellers_rows(self.width, self.height, self.bias, self.rng, state):
+            self.maze.set_row(state['rows'] - 1, row)
+            yield
+
+
+def ellers_state(width):
+    """Returns the sets of ellers_rows before the first row, as a dict.
+
+    Returns:
+        {'rows': number of rows made, 'labels': array of the set of every lattice space in the row,
+         'members': [[lattice spaces in the set], ...] for every label, 'free_labels': [unused label, ...]}
+    """
+    lattice_width = (width + 1) // 2
+    return {'rows': 0,
+            'labels': array('i', range(lattice_width)),
+            'members': [[x] for x in range(lattice_width)],
+            # labels of the sets that were joined into another one (so have no members)
+            'free_labels': []}
+
+
+def ellers_rows(width, height, bias=0.0, rng=random, state=None):
+    """Yields the rows of an Eller's maze from y = 0 up as they are finished, without building the whole grid.
+
+    Only the sets of the path spaces in the current row are kept: labels[x] is the set of lattice space x and
+    members[label] lists the spaces in that set.  Joining two sets relabels the smaller one and dropping down
+    only touches the members of each set, so every row takes time in proportion to the width and mazes of any
+    height fit in memory that only depends on the width.
+
+    Args:
+        width - (int) width of the maze
+        height - (int) height of the maze
+        bias - (float) 0.0 to 1.0, chance of a row's neighboring sets not being joined
+        rng (optional) - (random.Random) generator to draw the random numbers from
+        state (optional) - (dict) sets to carry on from, updated as the rows are made (see ellers_state)
+
+    Yields:
+        (bytearray) width bytes for each row of the maze (1 = path, 0 = wall)
+    """
+    if state is None:
+        state = ellers_state(width)
+    lattice_width = (width + 1) // 2
+    labels = state['labels']
+    members = state['members']
+    free_labels = state['free_labels']
+
+    while state['rows'] < height:
+        y = state['rows']
+        state['rows'] += 1
+        if not y & 1:
+            # every other space in the row is on the lattice, so it is a path
+            row = bytearray(width)
+            row[::2] = b'\x01' * lattice_width
+
+            # the bottom row joins every set left, otherwise neighbors are joined by chance (use bias)
+            last_row = y + 2 >= height
+            for x in range(lattice_width - 1):
+                label = labels[x]
+                neighbor = labels[x + 1]
+                if label != neighbor and (last_row or rng.random() > bias):
+                    row[2 * x + 1] = 1
+                    # relabel the smaller set
+                    if len(members[label]) < len(members[neighbor]):
+                        label, neighbor = neighbor, label
+                    joining = members[neighbor]
+                    for i in joining:
+                        labels[i] = label
+                    members[label].extend(joining)
+                    members[neighbor] = []
+                    free_labels.append(neighbor)
+            yield row
+            continue
+
+        # drop down sets - every set draws as many times as it has members so it drops AT LEAST once
+        below = bytearray(width)
+        left_behind = []
+        for label, spaces in enumerate(members):
+            if not spaces:
                 continue
+            dropped = {rng.choice(spaces) for _ in spaces}
+            for x in dropped:
+                below[2 * x] = 1
+            if len(dropped) < len(spaces):
+                left_behind.extend(x for x in spaces if x not in dropped)
+                members[label] = list(dropped)
+
+        # the rest become sets of their own (there are always at least as many free labels as spaces left)
+        for x in left_behind:
+            label = free_labels.pop()
+            labels[x] = label
+            members[label] = [x]
+        yield below
+
+
+# the generators load_checkpoint will make, by the class name save_checkpoint writes
+CHECKPOINT_GENERATORS = {generator.__name__: generator
+                         for generator in (BinaryTreeMaze, DepthFirstMaze, PrimsMaze, BreadthFirstMaze, EllersMaze,
+                                           KruskalsMaze)}
+
+
+def load_checkpoint(path, show_progress=True):
+    """Returns the generator saved to path by save_checkpoint, ready to carry on with make_with_checkpoints.
+
+    Only the generators in CHECKPOINT_GENERATORS are made and only the array types in CHECKPOINT_TYPECODES are
+    read, so a checkpoint is data and never runs any code.  Raises ValueError if path isn't a whole checkpoint
+    of a version this add-on can read (and OSError if it can't be read at all).
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+            raise ValueError("{} isn't a maze checkpoint".format(path))
+        header_length = int.from_bytes(f.read(4), 'little')
+        header = json.loads(f.read(header_length).decode('utf-8'))
+        if not isinstance(header, dict):
+            raise ValueError("{} has no checkpoint header".format(path))
+        if header.get('version') != CHECKPOINT_VERSION:
+            raise ValueError("Can't read version {} maze checkpoints".format(header.get('version')))
+        missing = [key for key in CHECKPOINT_KEYS if key not in header]
+        if missing:
+            raise ValueError("{} is missing {} from its header".format(path, ", ".join(missing)))
+        if header['generator'] not in CHECKPOINT_GENERATORS:
+            raise ValueError("Unknown maze generator {} in {}".format(header['generator'], path))
+
+        arrays = {}
+        for name, typecode, nbytes in header['arrays']:
+            if typecode not in CHECKPOINT_TYPECODES:
+                raise ValueError("Unknown array type {} in {}".format(typecode, path))
+            data = f.read(nbytes)
+            if len(data) != nbytes:
+                raise ValueError("{} ends before all of its arrays".format(path))
+            arrays[name] = array(typecode, data)
+            if header['byteorder'] != sys.byteorder:
+                arrays[name].byteswap()
+
+    # the generator carries on with its own random stream, whatever it was drawing from when it was saved
+    generator_type = CHECKPOINT_GENERATORS[header['generator']]
+    try:
+        generator = generator_type(debug=header['debug'], width=header['width'], height=header['height'],
+                                   storage=header['storage'], show_progress=False, seed=header['seed'],
+                                   rng=random.Random(), defer=True, **header['kwargs'])
+        generator.restore_state(header['values'], arrays)
+    except (KeyError, TypeError) as error:
+        # a value or array the generator needs is missing or the wrong type
+        raise ValueError("{} doesn't have the state of a {}: {!r}".format(path, header['generator'], error))
+    generator.show_progress = show_progress
+    generator.start_progress()
+    return generator
+
+
+def rows_to_text(rows, end="\n"):
+    """Yields each row as a string of 1's (paths) and 0's (walls), the format of the text block mazes.
+
+    Args:
+        rows - (iterable of bytes-like objects) rows of 1's and 0's, like the ones from ellers_rows
+        end (optional) - (string) added after every row, text blocks have none (see read_text_maze)
+    """
+    for row in rows:
+        yield bytes(row).translate(TEXT_DIGITS).decode('ascii') + end
+
+
+def read_text_maze(text, width, height):
+    """Returns the 1's and 0's of a text block maze without any newlines (see rows_to_text).
+
+    Raises ValueError if there aren't width * height of them.
+    """
+    text = text.replace("\n", "")
+    if len(text) != width * height:
+        raise ValueError("A {}x{} maze has {} spaces, the text has {}".format(width, height, width * height,
+                                                                              len(text)))
+    return text
+
+
+def main(argv=None):
+    """Generates a maze in the terminal, e.g. python maze_tools.py PrimsMaze --width 999 --checkpoint big.ckpt"""
+    parser = argparse.ArgumentParser(description="Generates a maze layout outside of Blender.")
+    parser.add_argument('generator', nargs='?', default='EllersMaze',
+                        choices=['BinaryTreeMaze', 'DepthFirstMaze', 'PrimsMaze', 'BreadthFirstMaze', 'EllersMaze',
+                                 'KruskalsMaze'])
+    parser.add_argument('--width', type=int, default=99)
+    parser.add_argument('--height', type=int, default=45)
+    parser.add_argument('--seed', type=int, help="makes the same maze every time it's used")
+    parser.add_argument('--bias', type=float, default=0.75)
+    parser.add_argument('--bias-direction', default='RANDOM', choices=['RANDOM', 'X', 'Y'])
+    parser.add_argument('--directions', default='RANDOM', choices=['RANDOM', 'NE', 'NW', 'SE', 'SW'])
+    parser.add_argument('--checkpoint', help="file to save checkpoints to while generating")
+    parser.add_argument('--interval', type=float, default=60.0, help="least number of seconds between checkpoints")
+    parser.add_argument('--resume', action='store_true', help="carry on from the maze saved in --checkpoint")
+    parser.add_argument('--output', help="text file to write the finished maze to (1 = path, 0 = wall)")
+    parser.add_argument('--quiet', action='store_true', help="don't display the maze while it generates")
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs the --checkpoint to resume from")
+
+    if args.resume:
+        m = load_checkpoint(args.checkpoint, show_progress=not args.quiet)
+    else:
+        if args.generator in ('DepthFirstMaze', 'PrimsMaze', 'BreadthFirstMaze'):
+            kwargs = {'bias_direction': args.bias_direction, 'bias': args.bias}
+        elif args.generator == 'EllersMaze':
+            kwargs = {'bias': args.bias}
+        elif args.generator == 'BinaryTreeMaze':
+            kwargs = {'directions': args.directions}
+        else:
+            kwargs = {}
+        m = globals()[args.generator](debug=True, width=args.width, height=args.height, seed=args.seed,
+                                      show_progress=not args.quiet, defer=bool(args.checkpoint), **kwargs)
+
+    if args.checkpoint:
+        m.make_with_checkpoints(args.checkpoint, args.interval)
 
+    if args.output:
+        maze = m.get()
+        with open(args.output, 'w') as f:
+            f.writelines(rows_to_text(maze.get_row(y) for y in range(maze.height)))
 
-def main():
-    # BinaryTreeMaze('NW', debug=True, width=33, height=23)
-    # DepthFirstMaze(bias_direction='RANDOM', bias=.5, debug=True, width=99, height=45)
-    # PrimsMaze(bias_direction='RANDOM', bias=.5, debug=True, width=99, height=45)
-    # BreadthFirstMaze(bias_direction='RANDOM', bias=.5, debug=True, width=99, height=45)
-    EllersMaze(bias=0.75, debug=True, width=99, height=45)
-    # KruskalsMaze(debug=True, width=99, height=45)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,227 @@
+# Copyright 2017 Integrity Software and Games, LLC
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of UltiMaze.
+#
+# UltiMaze is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# UltiMaze is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Generates big mazes as a grid of regions in parallel processes.
+
+Every region is a perfect maze of its own, made by any of the maze_tools generators.  The regions line up
+with the lattice of path spaces (their x and y start even and their sizes are odd), so between two regions
+there is always one column or row of walls: the seam.  A random spanning tree of the regions picks which
+neighbors are joined, and one passage is opened in the seam of each joined pair, so the whole maze is
+perfect too.  Every region draws from its own stream of the seed, so the maze is the same no matter how
+many processes made it.
+
+Available Functions:
+    split_lattice - Splits a number of lattice spaces into nearly even parts
+    make_regions - Returns the rectangle of every region of a maze
+    generate_region - Generates one region, runs in the worker processes
+    open_seams - Joins the regions with a random spanning tree of seam passages
+    map_jobs - Yields the results of a function for every job, from worker processes if it can
+    make_parallel_maze - Generates a maze region by region in parallel processes
+"""
+
+IN_BLENDER = True
+
+import multiprocessing
+import random
+import sys
+
+if IN_BLENDER:
+    from . import maze_tools
+    from .trees import DisjointSet
+    from .progress_display import BlenderProgress
+else:
+    import maze_tools
+    from trees import DisjointSet
+
+
+def split_lattice(length, parts):
+    """Returns [(start, end), ...] splitting range(length) into parts nearly even, non-empty ranges."""
+    parts = max(1, min(parts, length))
+    size, extra = divmod(length, parts)
+    ranges = []
+    start = 0
+    for part in range(parts):
+        end = start + size + (part < extra)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def make_regions(width, height, region_size):
+    """Returns the rectangle of every region of a maze.
+
+    Args:
+        width - (int) width of the maze
+        height - (int) height of the maze
+        region_size - (int) largest width and height of a region (in spaces)
+
+    Returns:
+        regions - [(x, y, width, height), ...] row by row, the x and y of every region are even and the
+            sizes are odd, so regions only touch across a seam of walls
+        columns - (int) number of regions in each row
+    """
+    lattice_size = max(1, (region_size + 1) // 2)
+    lattice_width = (width + 1) // 2
+    lattice_height = (height + 1) // 2
+    columns = split_lattice(lattice_width, -(-lattice_width // lattice_size))
+    rows = split_lattice(lattice_height, -(-lattice_height // lattice_size))
+
+    regions = []
+    for y_start, y_end in rows:
+        for x_start, x_end in columns:
+            regions.append((2 * x_start, 2 * y_start, 2 * (x_end - x_start) - 1, 2 * (y_end - y_start) - 1))
+    return regions, len(columns)
+
+
+def generate_region(job):
+    """Generates one region, runs in the worker processes.
+
+    Args:
+        job - (tuple) index of the region, name of the generator class in maze_tools, width, height, seed,
+            keyword arguments for the generator
+
+    Returns:
+        index of the region, the spaces of the region row by row as bytes (1 = path, 0 = wall)
+    """
+    index, generator, width, height, seed, kwargs = job
+    rng = maze_tools.make_rng(seed, 'region', index)
+    maze = getattr(maze_tools, generator)(debug=True, width=width, height=height, show_progress=False,
+                                          rng=rng, **kwargs).get()
+    return index, b''.join(maze.get_row(y) for y in range(height))
+
+
+def open_seams(maze, regions, columns, rng):
+    """Joins the regions with a random spanning tree of seam passages.
+
+    Args:
+        maze - the maze holding every region
+        regions - [(x, y, width, height), ...] of the regions, row by row (see make_regions)
+        columns - (int) number of regions in each row
+        rng - (random.Random) generator to pick the tree and the passages with
+
+    Returns:
+        [(x, y), ...] of the passages that were opened
+    """
+    # the seams between every pair of neighbors: (region, neighbor, across the seam to the right)
+    seams = []
+    for i in range(len(regions)):
+        if i % columns < columns - 1:
+            seams.append((i, i + 1, True))
+        if i + columns < len(regions):
+            seams.append((i, i + columns, False))
+    rng.shuffle(seams)
+
+    sets = DisjointSet(len(regions))
+    passages = []
+    for region, neighbor, across in seams:
+        if not sets.union(region, neighbor):
+            continue
+
+        x, y, width, height = regions[region]
+        # pick a path space on the lattice along the seam and open the wall beside it
+        if across:
+            passage = (x + width, y + 2 * rng.randrange((height + 1) // 2))
+        else:
+            passage = (x + 2 * rng.randrange((width + 1) // 2), y + height)
+        maze.make_path(*passage)
+        passages.append(passage)
+    return passages
+
+
+def map_jobs(jobs, processes, function=generate_region, ordered=False):
+    """Yields the results of a function for every job, from worker processes if it can.
+
+    Args:
+        jobs - [argument for function, ...]
+        processes - (int) number of worker processes, None = one per core
+        function (optional) - module level function to call with each job
+        ordered (optional) - (boolean) yield the results in the order of the jobs instead of as they finish
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(jobs))
+
+    # forked workers already have the add-on imported, spawned ones would have to start (and find) it again,
+    # which a python embedded in Blender can't do...and forking Blender's window and GL state is only safe on
+    # linux (not macOS), so everywhere else the jobs run here
+    if processes > 1 and (not IN_BLENDER or sys.platform.startswith('linux')):
+        context = multiprocessing.get_context('fork' if IN_BLENDER else None)
+        with context.Pool(processes) as pool:
+            results = pool.imap(function, jobs) if ordered else pool.imap_unordered(function, jobs)
+            for result in results:
+                yield result
+    else:
+        for job in jobs:
+            yield function(job)
+
+
+def make_parallel_maze(generator, width, height, region_size=501, processes=None, seed=None, storage='BYTES',
+                       debug=True, show_progress=True, **kwargs):
+    """Generates a maze region by region in parallel processes.
+
+    Args:
+        generator - (string) name of the generator class in maze_tools, e.g. 'DepthFirstMaze'
+        width - (int) width of the maze
+        height - (int) height of the maze
+        region_size - (int) largest width and height of a region (in spaces)
+        processes (optional) - (int) number of worker processes, None = one per core, 1 = no workers
+        seed (optional) - (int) makes the same maze every time it's used, None = a different maze every time
+        storage (optional) - (string) key of maze_tools.MAZE_TYPES to choose how the finished maze is stored
+        debug (optional) - (boolean) debug mode (no console progress bar)
+        show_progress (optional) - (boolean) show the Blender progress while the regions are generated
+        kwargs - keyword arguments for the generator (bias, bias_direction, directions...)
+
+    Returns:
+        maze - the whole maze, stored as storage
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    rng = maze_tools.make_rng(seed, 'seams')
+
+    # pick random settings once, so every region looks like part of the same maze
+    if kwargs.get('bias_direction') not in (None, 'X', 'Y'):
+        kwargs['bias_direction'] = rng.choice(['X', 'Y'])
+    if kwargs.get('directions') not in (None, 'NE', 'NW', 'SE', 'SW'):
+        kwargs['directions'] = rng.choice(['NE', 'NW', 'SE', 'SW'])
+
+    regions, columns = make_regions(width, height, region_size)
+    jobs = [(i, generator, w, h, seed, kwargs) for i, (x, y, w, h) in enumerate(regions)]
+
+    bldr_prog = None
+    if IN_BLENDER and show_progress:
+        bldr_prog = BlenderProgress("Layout Gen", debug, throttle=True)
+        bldr_prog.set_total(len(jobs), 1)
+        bldr_prog.start()
+
+    maze = maze_tools.ByteMaze(width, height)
+    for index, spaces in map_jobs(jobs, processes):
+        # copy the region in row by row
+        x, y, w, h = regions[index]
+        for row in range(h):
+            start = maze.index(x, y + row)
+            maze.maze[start:start + w] = spaces[row * w:(row + 1) * w]
+        if bldr_prog:
+            bldr_prog.tick()
+
+    open_seams(maze, regions, columns, rng)
+
+    if bldr_prog:
+        bldr_prog.finish()
+    return maze_tools.convert_maze(maze, storage)
@@ -46,12 +46,26 @@ def console_prog(job, progress, total_time="?"):
 
 
 class BlenderProgress:
-    def __init__(self, job, debug=True):
+    """Reports the progress of a job to the Blender progress bar and the console.
+
+    By default every call to update is reported. With throttle on, a report is only made when the whole percent
+    changes, so hot loops can call update freely. Loops that count steps can use set_total and tick instead, which only work out the progress every
+    few steps.
+    """
+    def __init__(self, job, debug=True, throttle=False):
         self.job = job
         self.last_percent = None
         self.debug = debug
         self.elapsed_time_bp = 0
 
+        self.throttle = throttle
+
+        # step counting for tick
+        self.total = 0
+        self.every = 1
+        self.steps = 0
+        self.next_update = 1
+
         self.s_time = 0
 
     def start(self):
@@ -60,12 +74,39 @@ class BlenderProgress:
         if not self.debug:
             print("\n")
 
+    def set_total(self, total, every=None):
+        """Sets the number of steps tick counts up to.
+
+        Args:
+            total - (int) the number of steps the job is expected to take
+            every (optional) - (int) steps between updates, defaults to 1% of total
+        """
+        self.total = max(total, 1)
+        self.every = every or max(self.total // 100, 1)
+        self.steps = 0
+        self.next_update = self.every
+
+    def tick(self, steps=1):
+        """Counts steps, only updating the progress every few steps."""
+        self.steps += steps
+        if self.steps >= self.next_update:
+            self.next_update = self.steps + self.every
+            self.update(self.steps / self.total)
+
     def update(self, progress):
-        percent = progress * 100
-        if self.last_percent != percent and percent <= 100:
-            bpy.context.window_manager.progress_update(percent)
-            if not self.debug:
-                console_prog(self.job, progress)
+        if self.throttle:
+            percent = int(progress * 100)
+            if percent == self.last_percent or percent > 100:
+                return
+        else:
+            percent = progress * 100
+            if self.last_percent == percent or percent > 100:
+                self.last_percent = percent
+                return
+
+        bpy.context.window_manager.progress_update(percent)
+        if not self.debug:
+            console_prog(self.job, progress)
         self.last_percent = percent
 
     def finish(self):
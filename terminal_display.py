@@ -0,0 +1,155 @@
+# Copyright 2017 Integrity Software and Games, LLC
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of UltiMaze.
+#
+# UltiMaze is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# UltiMaze is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Displays mazes in a terminal while they generate outside of Blender.
+
+Available Functions:
+    maze_rows - Returns the rows of a maze as strings, with highlighted spaces shown with '$'
+    maze_text - Returns the rows of a maze with the axis labels and arrows around them
+
+Available Classes:
+    TerminalDisplay - Redraws a maze at a capped frame rate, only writing the spaces that changed
+"""
+
+import sys
+from time import time
+
+WALL_CHAR = "\u2588"
+HIGHLIGHT_CHAR = "$"
+
+# walls are translated to '#' first so whole rows can be translated as bytes, then swapped for WALL_CHAR
+SPACE_BYTES = bytes.maketrans(b'\x00\x01', b'# ')
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+MOVE_CURSOR = "\x1b[{};{}H"
+
+# lines above the first row of the maze (tens digits, ones digits, arrows)
+HEADER_LINES = 3
+
+
+def label_width(height):
+    """Returns how many characters the y-axis labels take up."""
+    return max(2, len(str(height - 1)))
+
+
+def maze_rows(maze, width, height, highlights=()):
+    """Returns the rows of a maze as strings, with highlighted spaces shown with '$'.
+
+    Args:
+        maze - maze with a get_row method (see maze_tools.Maze.get_row)
+        width - (int) width of the maze
+        height - (int) height of the maze
+        highlights (optional) - (iterable of ordered pairs) spaces to show with '$'
+    """
+    # group the highlights by row once, so each space isn't tested against every highlight
+    highlighted = {}
+    for x, y in highlights:
+        if 0 <= x < width:
+            highlighted.setdefault(y, set()).add(x)
+
+    rows = []
+    for y in range(height):
+        row = bytes(maze.get_row(y)).translate(SPACE_BYTES).decode('ascii')
+        if y in highlighted:
+            spaces = list(row)
+            for x in highlighted[y]:
+                spaces[x] = HIGHLIGHT_CHAR
+            row = "".join(spaces)
+        rows.append(row.replace("#", WALL_CHAR))
+    return rows
+
+
+def maze_text(rows, width):
+    """Returns the rows of a maze with the axis labels and arrows around them (the format of display)."""
+    indent = label_width(len(rows))
+    lines = [
+        # x-axis labels
+        " " * (indent + 2) + "".join(str(x // 10 % 10) for x in range(width)).replace("0", " "),
+        " " * (indent + 2) + "".join(str(x % 10) for x in range(width)),
+        # x-axis arrows
+        " " * (indent + 1) + "v" * (width + 2),
+    ]
+    # y-axis labels and arrows
+    lines.extend("{:{}d} >{}<".format(y, indent, row) for y, row in enumerate(rows))
+    # bottom x-axis arrows
+    lines.append(" " * (indent + 1) + "^" * (width + 2))
+    return "\n".join(lines)
+
+
+class TerminalDisplay:
+    """Redraws a maze in a terminal at a capped frame rate.
+
+    The first frame clears the screen and writes the whole maze. After that, ANSI cursor moves are used to
+    rewrite only the part of each row between its first and last changed space, and frames asked for sooner
+    than 1 / fps seconds after the last one are skipped.
+    """
+    def __init__(self, width, height, fps=30, stream=None):
+        self.width = width
+        self.height = height
+        self.frame_time = 1 / fps if fps else 0
+        self.stream = stream or sys.stdout
+
+        # the rows on screen, None until the first frame is drawn
+        self.rows = None
+        self.last_draw = 0
+
+    def draw(self, maze, highlights=(), force=False):
+        """Draws the maze if the last frame was long enough ago, returns True if a frame was drawn.
+
+        Args:
+            maze - maze with a get_row method (see maze_tools.Maze.get_row)
+            highlights (optional) - (iterable of ordered pairs) spaces to show with '$'
+            force (optional) - (boolean) draw even if the last frame was too recent
+        """
+        now = time()
+        if not force and now - self.last_draw < self.frame_time:
+            return False
+        self.last_draw = now
+
+        rows = maze_rows(maze, self.width, self.height, highlights)
+        if self.rows is None:
+            out = [CLEAR_SCREEN, maze_text(rows, self.width)]
+        else:
+            out = []
+            indent = label_width(self.height) + 2
+            for y, (old, new) in enumerate(zip(self.rows, rows)):
+                if old == new:
+                    continue
+                start = 0
+                while old[start] == new[start]:
+                    start += 1
+                end = len(new)
+                while old[end - 1] == new[end - 1]:
+                    end -= 1
+                out.append(MOVE_CURSOR.format(HEADER_LINES + y + 1, indent + start + 1))
+                out.append(new[start:end])
+            # leave the cursor at the end of the maze, where the first frame left it
+            out.append(MOVE_CURSOR.format(HEADER_LINES + self.height + 1, indent + self.width + 2))
+        self.rows = rows
+
+        self.stream.write("".join(out))
+        self.stream.flush()
+        return True
+
+    def finish(self, maze):
+        """Draws the last frame and moves to the line under the maze."""
+        self.draw(maze, force=True)
+        self.stream.write("\n")
+        self.stream.flush()
@@ -17,7 +17,13 @@
 # along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
 import unittest
+from unittest import mock
 
 import maze_tools
 from clock import Clock
@@ -54,6 +60,776 @@ class TestMaze(unittest.TestCase):
         self.assertLessEqual(result, 1)
 
 
+def grid_size(maze):
+    """Returns the number of bytes used by the grid of a maze."""
+    if isinstance(maze.maze, list):
+        return sys.getsizeof(maze.maze) + sum(sys.getsizeof(column) for column in maze.maze)
+    return sys.getsizeof(maze.maze)
+
+
+def carve_and_read(maze, size):
+    """Carves every other space in a size x size block, then reads the block back."""
+    for x in range(size):
+        for y in range(0, size, 2):
+            maze.make_path(x, y)
+    return sum(maze.is_path(x, y) for x in range(size) for y in range(size))
+
+
+class TestStorageBackends(unittest.TestCase):
+    """Measured on 2500x2500 (1000x1000 block carved and read back):
+
+        LIST   init 0.42s   51.4 MB   write 0.19s   read 0.25s
+        BYTES  init 0.004s   6.3 MB   write 0.30s   read 0.37s
+        BITS   init 0.001s   0.8 MB   write 0.54s   read 0.53s
+    """
+    maxDiff = 10000
+
+    def test_backends_match_list(self):
+        expected = maze_tools.Maze(7, 5)
+        expected.make_path(0, 0)
+        expected.make_path(6, 4)
+        expected.make_path(3, 2)
+        expected.make_wall(3, 2)
+        expected.make_path(1, 2)
+        for storage in ('BYTES', 'BITS'):
+            maze = maze_tools.MAZE_TYPES[storage](7, 5)
+            maze.make_path(0, 0)
+            maze.make_path(6, 4)
+            maze.make_path(3, 2)
+            maze.make_wall(3, 2)
+            maze.make_path(1, 2)
+
+            self.assertEqual(maze.get_maze(), expected.get_maze())
+            self.assertEqual(len(maze), len(expected))
+            self.assertEqual(maze.find_touching_path_dirs(1, 1), expected.find_touching_path_dirs(1, 1))
+
+    def test_backends_paths(self):
+        for storage in ('BYTES', 'BITS'):
+            maze = maze_tools.MAZE_TYPES[storage](10, 10, False)
+            self.assertEqual(maze.get_maze(), maze_tools.Maze(10, 10, False).get_maze())
+
+    def test_backends_memory(self):
+        list_size = grid_size(maze_tools.Maze(2500, 2500))
+        byte_size = grid_size(maze_tools.ByteMaze(2500, 2500))
+        bit_size = grid_size(maze_tools.BitMaze(2500, 2500))
+
+        self.assertLessEqual(byte_size * 7, list_size)
+        self.assertLessEqual(bit_size * 60, list_size)
+
+    def test_backends_speed(self):
+        clock = Clock("Init")
+        for storage in ('LIST', 'BYTES', 'BITS'):
+            clock.add_sub_job(storage)
+            maze = maze_tools.MAZE_TYPES[storage](2500, 2500)
+            self.assertEqual(carve_and_read(maze, 1000), 500000)
+            result = clock.stop(storage)
+
+            self.assertLessEqual(result, 4)
+
+
+def random_maze(storage, width, height, seed=0):
+    """Returns a maze of the given storage with about half of its spaces made paths."""
+    rand = random.Random(seed)
+    maze = maze_tools.MAZE_TYPES[storage](width, height)
+    for x in range(width):
+        for y in range(height):
+            if rand.random() < 0.5:
+                maze.make_path(x, y)
+    return maze
+
+
+@unittest.skipIf(maze_tools.np is None, "numpy is not installed")
+class TestNumpyMaze(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_matches_list(self):
+        expected = random_maze('LIST', 9, 7)
+        maze = random_maze('NUMPY', 9, 7)
+
+        self.assertEqual(maze.get_maze(), expected.get_maze())
+        self.assertEqual(maze.find_touching_path_dirs(0, 0), expected.find_touching_path_dirs(0, 0))
+
+    def test_path_masks_match_find_touching_path_dirs(self):
+        for storage in ('LIST', 'BYTES', 'BITS', 'NUMPY'):
+            maze = random_maze(storage, 9, 7)
+            masks = dict(zip(('N', 'W', 'E', 'S'), maze.path_masks()))
+            for x in range(maze.width):
+                for y in range(maze.height):
+                    result = [d for d in ('N', 'W', 'E', 'S') if masks[d][y, x]]
+
+                    self.assertEqual(result, maze.find_touching_path_dirs(x, y))
+
+    def test_neighbour_counts(self):
+        maze = random_maze('NUMPY', 9, 7)
+        counts = maze.neighbour_counts()
+        for x in range(maze.width):
+            for y in range(maze.height):
+                self.assertEqual(counts[y, x], len(maze.find_touching_path_dirs(x, y)))
+
+    def test_to_array(self):
+        for storage in ('LIST', 'BYTES', 'BITS', 'NUMPY'):
+            maze = random_maze(storage, 9, 7)
+
+            self.assertEqual(maze.to_array().T.tolist(), [[bool(a) for a in col] for col in maze.get_maze()])
+
+    def test_get_and_set_cells(self):
+        for storage in ('BYTES', 'NUMPY'):
+            maze = maze_tools.MAZE_TYPES[storage](5, 5)
+            maze.set_cells([0, 1, 4], [0, 2, 4])
+
+            self.assertEqual(maze.get_cells([0, 1, 4, 3], [0, 2, 4, 3]).tolist(), [True, True, True, False])
+
+            maze.set_cells([1], [2], path=False)
+
+            self.assertEqual(maze.is_path(1, 2), 0)
+
+
+class TestConnectivityMasks(unittest.TestCase):
+    maxDiff = 10000
+
+    def check_masks(self, maze):
+        masks = maze.connectivity_masks()
+        for x in range(maze.width):
+            for y in range(maze.height):
+                expected = sum(maze_tools.DIRECTION_BITS[d] for d in maze.find_touching_path_dirs(x, y))
+
+                self.assertEqual(masks[y * maze.width + x], expected)
+
+    @unittest.skipIf(maze_tools.np is None, "numpy is not installed")
+    def test_masks_numpy(self):
+        for storage in ('LIST', 'BYTES', 'BITS', 'NUMPY'):
+            self.check_masks(random_maze(storage, 11, 6))
+
+    def test_masks_without_numpy(self):
+        with mock.patch.object(maze_tools, 'np', None):
+            for storage in ('LIST', 'BYTES', 'BITS'):
+                self.check_masks(random_maze(storage, 11, 6))
+
+    def test_masks_speed(self):
+        maze = random_maze('BYTES', 1000, 1000)
+        clock = Clock("Masks")
+        maze.connectivity_masks()
+        result = clock.stop("Masks")
+
+        self.assertLessEqual(result, 2)
+
+
+class TestStraightWalls(unittest.TestCase):
+    """Seconds to open the loops of a 4001x4001 KruskalsMaze with a chance of 3 (single core), before and after
+    picking from the straight walls found in one pass:
+
+        with numpy      18.8  ->  0.37
+        without numpy    1.3  ->  0.8    (1001x1001)
+    """
+    maxDiff = 10000
+
+    def check_walls(self, maze):
+        expected = [y * maze.width + x for y in range(maze.height) for x in range(maze.width)
+                    if not maze.is_path(x, y) and maze.find_touching_path_dirs(x, y) in (['N', 'S'], ['W', 'E'])]
+
+        self.assertEqual(list(maze.straight_walls()), expected)
+
+    @unittest.skipIf(maze_tools.np is None, "numpy is not installed")
+    def test_straight_walls_numpy(self):
+        for storage in ('LIST', 'BYTES', 'BITS', 'NUMPY'):
+            self.check_walls(random_maze(storage, 11, 6))
+
+    def test_straight_walls_without_numpy(self):
+        with mock.patch.object(maze_tools, 'np', None):
+            for storage in ('LIST', 'BYTES', 'BITS'):
+                self.check_walls(random_maze(storage, 11, 6))
+
+    def test_make_paths(self):
+        for storage in maze_tools.MAZE_TYPES:
+            maze = maze_tools.MAZE_TYPES[storage](7, 5)
+            maze.make_paths([0, 8, 34, 20])
+
+            paths = [(x, y) for x in range(7) for y in range(5) if maze.is_path(x, y)]
+
+            self.assertEqual(paths, [(0, 0), (1, 1), (6, 2), (6, 4)], storage)
+
+    def test_pick_by_chance(self):
+        items = list(range(100000))
+        for np_module in (maze_tools.np, None):
+            with mock.patch.object(maze_tools, 'np', np_module):
+                picked = list(maze_tools.pick_by_chance(items, 4, random.Random(1)))
+
+                self.assertAlmostEqual(len(picked) / len(items), 0.25, delta=0.01)
+                self.assertEqual(picked, sorted(set(picked)))
+                self.assertEqual(list(maze_tools.pick_by_chance(items[:10], 1)), items[:10])
+                self.assertEqual(list(maze_tools.pick_by_chance(items, 3, random.Random(2))),
+                                 list(maze_tools.pick_by_chance(items, 3, random.Random(2))))
+
+    @unittest.skipIf(maze_tools.np is None, "numpy is not installed")
+    def test_pick_by_chance_old_numpy(self):
+        # numpy before 1.17 (bundled with Blender 2.7x) has no default_rng, only RandomState
+        items = list(range(1000))
+        random_state = maze_tools.np.random.RandomState
+        with mock.patch.object(maze_tools.np.random, 'RandomState', side_effect=random_state) as patched:
+            picked = list(maze_tools.pick_by_chance(items, 4, random.Random(1)))
+
+        patched.assert_called_once_with(mock.ANY)
+        self.assertAlmostEqual(len(picked) / len(items), 0.25, delta=0.05)
+
+    def test_open_loops(self):
+        maze = make_generator('KruskalsMaze', 101).get()
+        walls = set(int(i) for i in maze.straight_walls())
+        picked = maze_tools.pick_by_chance(maze.straight_walls(), 5, random.Random(3))
+        opened = maze_tools.drop_touching(picked, maze.width)
+        maze.make_paths(opened)
+
+        # only straight walls are opened, so no spaces are opened that weren't walls between two paths
+        self.assertTrue(set(int(i) for i in opened) <= set(int(i) for i in picked) <= walls)
+        self.assertAlmostEqual(len(picked) / len(walls), 0.2, delta=0.03)
+        self.assertFalse(is_perfect(maze))
+
+    def test_no_rooms(self):
+        for np_module in (maze_tools.np, None):
+            with mock.patch.object(maze_tools, 'np', np_module):
+                for name in ('DepthFirstMaze', 'KruskalsMaze', 'BinaryTreeMaze'):
+                    for chance in (1, 3):
+                        maze = make_generator(name, 41, seed=chance).get()
+                        picked = maze_tools.pick_by_chance(maze.straight_walls(), chance, random.Random(chance))
+                        maze.make_paths(maze_tools.drop_touching(picked, maze.width))
+
+                        rooms = [(x, y) for x in range(maze.width - 1) for y in range(maze.height - 1)
+                                 if all(maze.is_path(x + dx, y + dy) for dx in (0, 1) for dy in (0, 1))]
+                        self.assertEqual(rooms, [], "{} {} {}".format(name, chance, np_module is not None))
+
+    def test_drop_touching(self):
+        # the walls open_loops used to open: each picked one that is still straight when the scan gets to it
+        for np_module in (maze_tools.np, None):
+            with mock.patch.object(maze_tools, 'np', np_module):
+                for seed in range(5):
+                    expected = make_generator('DepthFirstMaze', 31, seed=seed, bias=0.9).get()
+                    maze = make_generator('DepthFirstMaze', 31, seed=seed, bias=0.9).get()
+                    picked = [int(i) for i in maze_tools.pick_by_chance(maze.straight_walls(), 1)]
+                    for i in sorted(picked, key=lambda i: (i % maze.width, i // maze.width)):
+                        y, x = divmod(i, maze.width)
+                        if expected.find_touching_path_dirs(x, y) in (['N', 'S'], ['W', 'E']):
+                            expected.make_path(x, y)
+
+                    maze.make_paths(maze_tools.drop_touching(picked, maze.width))
+
+                    self.assertEqual(maze.get_maze(), expected.get_maze())
+
+
+def is_perfect(maze):
+    """Returns True if the paths of the maze form a tree: all connected and without loops."""
+    paths = [(x, y) for x in range(maze.width) for y in range(maze.height) if maze.is_path(x, y)]
+    # every pair of touching paths is an edge of the graph, count each one once
+    edges = sum(maze.is_path(x + 1, y) for x, y in paths if x + 1 < maze.width)
+    edges += sum(maze.is_path(x, y + 1) for x, y in paths if y + 1 < maze.height)
+
+    seen = {paths[0]}
+    stack = [paths[0]]
+    while stack:
+        x, y = stack.pop()
+        for t in maze.find_exist_touching(x, y):
+            if t not in seen and maze.is_path(t[0], t[1]):
+                seen.add(t)
+                stack.append(t)
+
+    return len(seen) == len(paths) and edges == len(paths) - 1
+
+
+def make_generator(name, size, **kwargs):
+    """Generates a maze with the named generator class without showing progress."""
+    if name in ('BreadthFirstMaze', 'DepthFirstMaze', 'PrimsMaze'):
+        kwargs.setdefault('bias_direction', 'X')
+        kwargs.setdefault('bias', 0.5)
+    elif name == 'BinaryTreeMaze':
+        kwargs.setdefault('directions', 'NE')
+    kwargs.setdefault('width', size)
+    kwargs.setdefault('height', size)
+    return getattr(maze_tools, name)(debug=True, show_progress=False, **kwargs)
+
+
+GENERATORS = ('BinaryTreeMaze', 'DepthFirstMaze', 'BreadthFirstMaze', 'PrimsMaze', 'KruskalsMaze', 'EllersMaze')
+
+
+class TestGenerators(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_perfect_mazes(self):
+        for name in GENERATORS:
+            for size in (3, 5, 21, 51):
+                random.seed(size)
+                maze = make_generator(name, size).get()
+
+                self.assertTrue(is_perfect(maze), "{} {}x{}".format(name, size, size))
+
+    def test_storage(self):
+        for storage in sorted(maze_tools.MAZE_TYPES):
+            random.seed(0)
+            maze = make_generator('DepthFirstMaze', 21, storage=storage).get()
+
+            self.assertIs(type(maze), maze_tools.MAZE_TYPES[storage])
+            self.assertTrue(is_perfect(maze))
+
+    def test_tileable_binary_tree_border(self):
+        random.seed(0)
+        maze = make_generator('BinaryTreeMaze', 21, directions='SE', tileable=True).get()
+
+        border = maze.maze[:maze.stride] + maze.maze[-maze.stride:]
+        border += maze.maze[::maze.stride] + maze.maze[maze.stride - 1::maze.stride]
+
+        self.assertEqual(sum(border), 0)
+
+
+class TestSeeds(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_same_maze_for_seed(self):
+        for name in GENERATORS:
+            kwargs = {'directions': 'RANDOM'} if name == 'BinaryTreeMaze' else {'bias_direction': 'RANDOM'}
+            if name in ('KruskalsMaze', 'EllersMaze'):
+                kwargs = {}
+            # scramble the global random numbers between runs, a seeded maze must not use them
+            random.seed(1)
+            first = make_generator(name, 31, seed=12, **kwargs).get().maze
+            random.seed(2)
+            second = make_generator(name, 31, seed=12, **kwargs).get().maze
+            other = make_generator(name, 31, seed=13, **kwargs).get().maze
+
+            self.assertEqual(first, second, name)
+            self.assertNotEqual(first, other, name)
+
+    def test_global_random_untouched(self):
+        for name in GENERATORS:
+            random.seed(0)
+            state = random.getstate()
+            make_generator(name, 21, seed=3)
+
+            self.assertEqual(random.getstate(), state, name)
+
+    def test_rng_overrides_seed(self):
+        expected = make_generator('PrimsMaze', 21, rng=random.Random(7)).get().maze
+        maze = make_generator('PrimsMaze', 21, seed=5, rng=random.Random(7)).get().maze
+
+        self.assertEqual(maze, expected)
+
+    def test_unseeded_uses_random_module(self):
+        random.seed(4)
+        expected = make_generator('EllersMaze', 21).get().maze
+        random.seed(4)
+        maze = make_generator('EllersMaze', 21).get().maze
+
+        self.assertEqual(maze, expected)
+
+    def test_derive_seed(self):
+        seeds = {maze_tools.derive_seed(1, 'region', i) for i in range(100)}
+        seeds.add(maze_tools.derive_seed(1))
+        seeds.add(maze_tools.derive_seed(2))
+
+        self.assertEqual(len(seeds), 102)
+        # the same in every process (hash() of a str is not)
+        self.assertEqual(maze_tools.derive_seed(1, 'loops'), maze_tools.derive_seed(1, 'loops'))
+        self.assertEqual(maze_tools.derive_seed(0), 7165777869350885009)
+        self.assertTrue(all(0 <= seed < 2 ** 64 for seed in seeds))
+
+    def test_make_rng(self):
+        self.assertIs(maze_tools.make_rng(None), random)
+        self.assertEqual(maze_tools.make_rng(9, 'a').random(), maze_tools.make_rng(9, 'a').random())
+        self.assertNotEqual(maze_tools.make_rng(9, 'a').random(), maze_tools.make_rng(9, 'b').random())
+
+
+class TestIterMake(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_same_maze_as_make(self):
+        for name in GENERATORS:
+            expected = make_generator(name, 31, seed=5).get()
+            generator = make_generator(name, 31, seed=5, defer=True)
+
+            self.assertFalse(any(generator.get().maze), name)
+
+            for _ in generator.iter_make(7):
+                pass
+
+            self.assertEqual(generator.get().maze, expected.maze, name)
+
+    def test_yields_every_steps(self):
+        generator = make_generator('EllersMaze', 21, defer=True)
+        done = list(generator.iter_make(3))
+
+        # one step per row (lattice rows and the rows between them), then once more when it's finished
+        self.assertEqual(done, [3, 6, 9, 12, 15, 18, 21, 21])
+
+    def test_stored_when_finished(self):
+        generator = make_generator('DepthFirstMaze', 21, seed=1, storage='LIST', defer=True)
+        steps = generator.iter_make(50)
+        next(steps)
+
+        self.assertIs(type(generator.get()), maze_tools.ByteMaze)
+
+        for _ in steps:
+            pass
+
+        self.assertIs(type(generator.get()), maze_tools.Maze)
+        self.assertTrue(is_perfect(generator.get()))
+
+
+class TestCheckpoints(unittest.TestCase):
+    """Seconds to save a checkpoint of a 2001x2001 maze halfway through (single core) and its size:
+
+        DepthFirstMaze   0.02   0.5 MB
+        KruskalsMaze     0.03   5.5 MB
+        EllersMaze       0.02   0.5 MB
+
+    With the least interval of 60 seconds that is well under 0.1% of the time.
+    """
+    maxDiff = 10000
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "maze.ckpt")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pack_bits(self):
+        for spaces in (b'', b'\x00', b'\x01', b'\x00\x00\x01', bytes(range(3)) * 7, b'\x01' * 17):
+            packed = maze_tools.pack_bits(spaces)
+
+            self.assertEqual(len(packed), len(spaces) // 8 + 1)
+            self.assertEqual(maze_tools.unpack_bits(packed), bytearray(min(space, 1) for space in spaces))
+
+    def test_resume_same_maze(self):
+        for name in GENERATORS:
+            for chunks in (1, 4):
+                expected = make_generator(name, 31, seed=5).get()
+                generator = make_generator(name, 31, seed=5, defer=True)
+                steps = generator.iter_make(7)
+                for _ in range(chunks):
+                    next(steps)
+                generator.save_checkpoint(self.path)
+                # the rest of the first run is lost
+                del steps
+
+                resumed = maze_tools.load_checkpoint(self.path, show_progress=False)
+                resumed.make_with_checkpoints(self.path)
+
+                self.assertEqual(resumed.get().maze, expected.maze, "{} {}".format(name, chunks))
+                self.assertFalse(os.path.exists(self.path))
+
+    def test_bad_checkpoints(self):
+        generator = make_generator('DepthFirstMaze', 31, seed=5, defer=True)
+        next(generator.iter_make(7))
+        generator.save_checkpoint(self.path)
+        with open(self.path, 'rb') as f:
+            saved = f.read()
+        magic = maze_tools.CHECKPOINT_MAGIC
+        header_length = int.from_bytes(saved[len(magic):len(magic) + 4], 'little')
+        header = saved[len(magic) + 4:len(magic) + 4 + header_length]
+        arrays = saved[len(magic) + 4 + header_length:]
+
+        def with_header(new_header):
+            return magic + len(new_header).to_bytes(4, 'little') + new_header + arrays
+
+        for name, data in (('magic', b'\x80\x04' + saved[len(magic):]),
+                           ('version', with_header(header.replace(b'"version": 1', b'"version": 2'))),
+                           ('generator', with_header(header.replace(b'"DepthFirstMaze"', b'"os.system"'))),
+                           ('header key', with_header(header.replace(b'"byteorder"', b'"order"'))),
+                           ('value', with_header(header.replace(b'"loops"', b'"steps"'))),
+                           ('array', with_header(header.replace(b'"cells"', b'"frontier"'))),
+                           ('header', with_header(b'[1]')),
+                           ('truncated', saved[:-1])):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(ValueError, msg=name):
+                maze_tools.load_checkpoint(self.path, show_progress=False)
+
+    def test_resume_unseeded(self):
+        random.seed(3)
+        expected = make_generator('PrimsMaze', 31, defer=True)
+        steps = expected.iter_make(10)
+        next(steps)
+        expected.save_checkpoint(self.path)
+        for _ in steps:
+            pass
+
+        resumed = maze_tools.load_checkpoint(self.path, show_progress=False)
+        random.seed(4)
+        resumed.make_with_checkpoints(self.path)
+
+        self.assertEqual(resumed.get().maze, expected.get().maze)
+
+    def test_saves_checkpoints(self):
+        expected = make_generator('KruskalsMaze', 41, seed=2).get()
+        generator = make_generator('KruskalsMaze', 41, seed=2, defer=True)
+        save_checkpoint = maze_tools.OrthogonalMaze.save_checkpoint
+        with mock.patch.object(maze_tools.OrthogonalMaze, 'save_checkpoint', autospec=True,
+                               side_effect=save_checkpoint) as save:
+            generator.make_with_checkpoints(self.path, interval=0, steps=100)
+
+        # the first one is due at once, later ones wait 50 times as long as a save took
+        self.assertGreaterEqual(save.call_count, 1)
+        self.assertEqual(generator.get().maze, expected.maze)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_iter_make_checkpoints(self):
+        expected = make_generator('PrimsMaze', 41, seed=4).get()
+        generator = make_generator('PrimsMaze', 41, seed=4, defer=True)
+        steps = generator.iter_make(50, self.path, interval=0)
+        next(steps)
+
+        # saved before the first yield, so stopping there loses nothing
+        self.assertTrue(os.path.isfile(self.path))
+        resumed = maze_tools.load_checkpoint(self.path, show_progress=False)
+        for _ in steps:
+            pass
+
+        self.assertEqual(generator.get().maze, expected.maze)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        resumed.make_with_checkpoints(self.path)
+        self.assertEqual(resumed.get().maze, expected.maze)
+
+    def test_cli_resume(self):
+        output = os.path.join(self.temp_dir.name, "maze.txt")
+        maze_tools.main(['KruskalsMaze', '--width', '21', '--height', '11', '--seed', '6', '--quiet',
+                         '--output', output])
+        with open(output) as f:
+            expected = f.read()
+
+        generator = make_generator('KruskalsMaze', 21, height=11, seed=6, defer=True)
+        next(generator.iter_make(30))
+        generator.save_checkpoint(self.path)
+        maze_tools.main(['--checkpoint', self.path, '--resume', '--quiet', '--output', output])
+
+        with open(output) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertEqual(len(expected.split()), 11)
+
+
+class TestFrontiers(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_remove_index(self):
+        for frontier_type in (maze_tools.CellList, maze_tools.CellQueue, maze_tools.CellBag):
+            cells = frontier_type()
+            for i in range(5):
+                cells.append(i)
+            for value in (0, 4, 2):
+                cells.remove_index(list(cells).index(value))
+
+            self.assertEqual(sorted(cells), [1, 3])
+
+    def test_same_mazes_as_list(self):
+        class ListBreadthFirstMaze(maze_tools.BreadthFirstMaze):
+            frontier_type = maze_tools.CellList
+
+        random.seed(3)
+        expected = ListBreadthFirstMaze(bias_direction='Y', bias=0.3, debug=True, width=31, height=21,
+                                        show_progress=False).get()
+        random.seed(3)
+        maze = make_generator('BreadthFirstMaze', 0, bias_direction='Y', bias=0.3, width=31, height=21)
+
+        self.assertEqual(maze.get().get_maze(), expected.get_maze())
+
+
+class TestGeneratorSpeed(unittest.TestCase):
+    """Seconds for 1001x1001 (single core), before and after the padded grid, then the index carving kernel:
+
+        BinaryTreeMaze     0.68  ->  0.30
+        DepthFirstMaze     7.35  ->  5.32  ->  0.88  ->  0.58 with permutation tables (~870k steps per second)
+        BreadthFirstMaze   7.83  ->  5.22  ->  0.90  ->  0.59
+        PrimsMaze          7.57  ->  5.89  ->  1.35  ->  1.06
+        EllersMaze         3.43  ->  3.39  ->  0.22 with set labels and member lists
+        KruskalsMaze       over 10 minutes  ->  1.58 with union-find  ->  0.82 with an int wall array
+
+    KruskalsMaze at 5001x5001 went from 1329 MB peak (wall tuples) to 134 MB with the wall array.
+
+    A step is one pass of the growing tree loop, 2 * N - 1 of them for N lattice cells (502001 at 1001x1001).
+    """
+    maxDiff = 10000
+
+    def test_generator_speed(self):
+        for name, size, limit in (('BinaryTreeMaze', 1001, 2), ('DepthFirstMaze', 1001, 5),
+                                  ('BreadthFirstMaze', 1001, 5), ('PrimsMaze', 1001, 5),
+                                  ('EllersMaze', 1001, 2), ('KruskalsMaze', 1001, 5)):
+            clock = Clock(name)
+            make_generator(name, size)
+            result = clock.stop(name)
+
+            self.assertLessEqual(result, limit, name)
+
+    def test_ellers_rows_scale_linearly(self):
+        """Microseconds per space for ellers_rows (heights of 21 to 201), before and after the member lists:
+
+            width     101   0.7  ->  0.3
+            width    1001   4.2  ->  0.3
+            width    5001  22.3  ->  0.4
+            width   20001  78.4  ->  0.3
+        """
+        times = []
+        for width in (101, 1001, 5001, 20001):
+            clock = Clock(str(width))
+            for _ in maze_tools.ellers_rows(width, 201, 0.5):
+                pass
+            times.append(clock.stop(str(width)) / width)
+
+        # time per space shouldn't grow with the width
+        self.assertLess(times[-1], times[1] * 3)
+
+
+class TestCarvingKernel(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_permutation_table(self):
+        gen = make_generator('DepthFirstMaze', 3, bias=0.7, bias_direction='Y')
+        running_sums, orders = gen.permutation_table()
+        self.assertEqual(len(orders), 24)
+        self.assertEqual(running_sums[-1], 1.0)
+        self.assertEqual(running_sums, sorted(running_sums))
+        # the table is only worked out once
+        self.assertIs(gen.permutation_table(), gen.order_table)
+
+    def test_bias_matches_weira_shuffle(self):
+        """The kernel's first choice of move should be spread like the first choice of weira_shuffle."""
+        random.seed(4)
+        trials = 10000
+        shuffled = [0] * 4
+        for _ in range(trials):
+            shuffled[maze_tools.weira.weira_shuffle([[0, 0], [1, 0], [2, 1], [3, 1]], 0.7)[0]] += 1
+
+        class RecordingCells(maze_tools.CellList):
+            def append(self, cell):
+                appended.append(cell)
+                super().append(cell)
+
+        class RecordingMaze(maze_tools.DepthFirstMaze):
+            frontier_type = RecordingCells
+
+            def start_location(self):
+                return 2, 2
+
+        # from the middle of a 5x5 maze every move is open, the second cell appended is the first move
+        x_moves = 0
+        for _ in range(trials):
+            appended = []
+            RecordingMaze(debug=True, width=5, height=5, bias_direction='X', bias=0.7, show_progress=False)
+            if abs(appended[1] - appended[0]) == 2:
+                x_moves += 1
+
+        # east and west are the first two directions
+        self.assertAlmostEqual(x_moves / trials, (shuffled[0] + shuffled[1]) / trials, delta=0.02)
+
+    def test_kernel_leaves_no_sentinels(self):
+        for name in ('DepthFirstMaze', 'BreadthFirstMaze', 'PrimsMaze'):
+            maze = make_generator(name, 21, storage='BYTES').get()
+            self.assertLessEqual(max(maze.maze), 1, name)
+            self.assertTrue(is_perfect(maze), name)
+
+
+class TestKruskalWalls(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_lattice_walls(self):
+        # a 5x3 maze has a 3x2 lattice: 2 right walls per row and 3 walls above the bottom row
+        walls = maze_tools.KruskalsMaze.lattice_walls(3, 2)
+        self.assertEqual(sorted(walls), [0, 1, 2, 3, 5, 6, 8])
+
+    def test_shuffle_walls(self):
+        walls = maze_tools.KruskalsMaze.lattice_walls(20, 20)
+        expected = sorted(walls)
+        maze_tools.KruskalsMaze.shuffle_walls(walls)
+        self.assertNotEqual(list(walls), expected)
+        self.assertEqual(sorted(walls), expected)
+
+        with mock.patch.object(maze_tools, 'np', None):
+            maze_tools.KruskalsMaze.shuffle_walls(walls)
+        self.assertEqual(sorted(walls), expected)
+
+    @unittest.skipIf(maze_tools.np is None, "numpy is not installed")
+    def test_shuffle_walls_old_numpy(self):
+        # numpy before 1.17 (bundled with Blender 2.7x) has no default_rng, only RandomState
+        walls = maze_tools.KruskalsMaze.lattice_walls(20, 20)
+        random_state = maze_tools.np.random.RandomState
+        with mock.patch.object(maze_tools.np.random, 'RandomState', side_effect=random_state) as patched:
+            maze_tools.KruskalsMaze.shuffle_walls(walls, random.Random(1))
+
+        patched.assert_called_once_with(mock.ANY)
+        self.assertNotEqual(list(walls), list(maze_tools.KruskalsMaze.lattice_walls(20, 20)))
+        self.assertEqual(sorted(walls), sorted(maze_tools.KruskalsMaze.lattice_walls(20, 20)))
+
+    def test_same_maze_for_seed(self):
+        for np_module in (maze_tools.np, None):
+            with mock.patch.object(maze_tools, 'np', np_module):
+                random.seed(6)
+                first = make_generator('KruskalsMaze', 21).get().get_maze()
+                random.seed(6)
+                second = make_generator('KruskalsMaze', 21).get().get_maze()
+            self.assertEqual(first, second)
+
+    def test_even_dimensions(self):
+        # walls past the last lattice row or column aren't listed, so even sizes don't read out of range
+        maze = make_generator('KruskalsMaze', 20).get()
+        self.assertTrue(is_perfect(maze))
+
+
+class TestEllersRows(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_rows_make_perfect_mazes(self):
+        random.seed(8)
+        for width, height in ((3, 3), (21, 21), (51, 21), (21, 20), (20, 21), (1, 7)):
+            maze = maze_tools.ByteMaze(width, height)
+            rows = list(maze_tools.ellers_rows(width, height, 0.5))
+            self.assertEqual(len(rows), height)
+            for y, row in enumerate(rows):
+                self.assertEqual(len(row), width)
+                maze.set_row(y, row)
+
+            self.assertTrue(is_perfect(maze), (width, height))
+
+    def test_get_and_set_row(self):
+        for storage in maze_tools.MAZE_TYPES:
+            maze = maze_tools.MAZE_TYPES[storage](5, 3)
+            maze.set_row(1, bytearray([1, 0, 1, 1, 0]))
+            self.assertEqual(maze.get_row(1), bytearray([1, 0, 1, 1, 0]), storage)
+            self.assertEqual(maze.get_row(0), bytearray(5), storage)
+            self.assertTrue(maze.is_path(3, 1), storage)
+
+    def test_rows_to_text(self):
+        text = "".join(maze_tools.rows_to_text([bytearray([1, 0, 1]), b'\x00\x01\x01']))
+        self.assertEqual(text, "101\n011\n")
+
+    def test_text_round_trip(self):
+        # text blocks are written like write_rows_to_text does, then read back like Text to Image does
+        maze = make_generator('KruskalsMaze', 21, height=11, seed=3).get()
+        rows = [maze.get_row(y) for y in range(maze.height)]
+        text = "".join(maze_tools.rows_to_text(rows, end=""))
+        spaces = maze_tools.read_text_maze(text, 21, 11)
+
+        self.assertEqual(len(text), 21 * 11)
+        self.assertEqual([spaces[y * 21 + x] == "1" for y in range(11) for x in range(21)],
+                         [maze.is_path(x, y) for y in range(11) for x in range(21)])
+        # the terminal tool writes a line per row, which reads the same
+        self.assertEqual(maze_tools.read_text_maze("".join(maze_tools.rows_to_text(rows)), 21, 11), spaces)
+        with self.assertRaises(ValueError):
+            maze_tools.read_text_maze(text, 11, 21 + 1)
+
+    def test_rows_match_seeded_maze(self):
+        # text-only Eller's layouts are streamed from the rows instead of the EllersMaze the settings would make
+        maze = make_generator('EllersMaze', 31, height=21, seed=8, bias=0.4).get()
+        rows = maze_tools.ellers_rows(31, 21, 0.4, maze_tools.make_rng(8))
+
+        self.assertEqual(list(rows), [maze.get_row(y) for y in range(21)])
+
+    def test_memory_does_not_grow_with_height(self):
+        peaks = []
+        for height in (201, 4001):
+            tracemalloc.start()
+            for _ in maze_tools.ellers_rows(201, height, 0.5):
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        # 20 times the rows in about the same memory
+        self.assertLess(peaks[1], peaks[0] * 2)
+
+
 class TestFindTouchingAndExist(unittest.TestCase):
     maxDiff = 10000
 
@@ -0,0 +1,128 @@
+# Copyright 2017 Integrity Software and Games, LLC
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of UltiMaze.
+#
+# UltiMaze is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# UltiMaze is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+
+import unittest
+from unittest import mock
+
+import maze_tools
+import parallel_gen
+from test_maze_tools import GENERATORS, is_perfect
+
+SETTINGS = {
+    'BinaryTreeMaze': {'directions': 'RANDOM', 'tileable': False},
+    'DepthFirstMaze': {'bias_direction': 'RANDOM', 'bias': 0.3},
+    'BreadthFirstMaze': {'bias_direction': 'X', 'bias': 0.0},
+    'PrimsMaze': {'bias_direction': 'Y', 'bias': 0.5},
+    'EllersMaze': {'bias': 0.5},
+}
+
+
+class TestRegions(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_split_lattice(self):
+        self.assertEqual(parallel_gen.split_lattice(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(parallel_gen.split_lattice(2, 5), [(0, 1), (1, 2)])
+        self.assertEqual(parallel_gen.split_lattice(7, 1), [(0, 7)])
+
+    def test_make_regions(self):
+        regions, columns = parallel_gen.make_regions(21, 9, 9)
+
+        self.assertEqual(columns, 3)
+        self.assertEqual(regions, [(0, 0, 7, 9), (8, 0, 7, 9), (16, 0, 5, 9)])
+
+    def test_regions_cover_lattice(self):
+        for width, height, region_size in ((41, 31, 5), (101, 21, 20), (9, 9, 1)):
+            regions, columns = parallel_gen.make_regions(width, height, region_size)
+            covered = set()
+            for x, y, w, h in regions:
+                self.assertFalse(x & 1 or y & 1 or not w & 1 or not h & 1)
+                self.assertLessEqual(max(w, h), max(region_size, 1))
+                covered.update((a, b) for a in range(x, x + w, 2) for b in range(y, y + h, 2))
+
+            self.assertEqual(covered, {(a, b) for a in range(0, width, 2) for b in range(0, height, 2)})
+            self.assertEqual(len(regions) % columns, 0)
+
+
+class TestParallelMaze(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_perfect_mazes(self):
+        for name in GENERATORS:
+            for region_size in (1, 5, 11, 1000):
+                maze = parallel_gen.make_parallel_maze(name, 41, 31, region_size=region_size, processes=1, seed=3,
+                                                       **SETTINGS.get(name, {}))
+
+                self.assertTrue(is_perfect(maze), "{} {}".format(name, region_size))
+
+    def test_one_seam_passage_per_tree_edge(self):
+        regions, columns = parallel_gen.make_regions(41, 31, 7)
+        maze = maze_tools.ByteMaze(41, 31)
+        passages = parallel_gen.open_seams(maze, regions, columns, maze_tools.make_rng(1))
+
+        self.assertEqual(len(passages), len(regions) - 1)
+        self.assertEqual(sum(maze.maze), len(regions) - 1)
+
+    def test_same_maze_for_any_number_of_processes(self):
+        kwargs = {'region_size': 21, 'seed': 8, 'bias_direction': 'RANDOM', 'bias': 0.5}
+        expected = parallel_gen.make_parallel_maze('PrimsMaze', 101, 61, processes=1, **kwargs)
+        for processes in (2, 3):
+            maze = parallel_gen.make_parallel_maze('PrimsMaze', 101, 61, processes=processes, **kwargs)
+
+            self.assertEqual(maze.maze, expected.maze)
+
+    def test_region_matches_generator(self):
+        # a region is the maze the generator makes from the region's stream of the seed
+        maze = parallel_gen.make_parallel_maze('EllersMaze', 21, 21, region_size=21, processes=1, seed=4)
+        expected = maze_tools.EllersMaze(debug=True, width=21, height=21, show_progress=False,
+                                         rng=maze_tools.make_rng(4, 'region', 0)).get()
+
+        self.assertEqual(maze.maze, expected.maze)
+
+    def test_map_jobs(self):
+        jobs = [(i, 'KruskalsMaze', 5 + 2 * i, 5, 1, {}) for i in range(6)]
+        expected = [parallel_gen.generate_region(job) for job in jobs]
+        for processes in (1, 3):
+            ordered = list(parallel_gen.map_jobs(jobs, processes, ordered=True))
+            unordered = list(parallel_gen.map_jobs(jobs, processes))
+
+            self.assertEqual(ordered, expected)
+            self.assertEqual(sorted(unordered), expected)
+
+    def test_no_fork_outside_linux_in_blender(self):
+        jobs = [(i, 'KruskalsMaze', 5, 5, 1, {}) for i in range(3)]
+        with mock.patch.object(parallel_gen, 'IN_BLENDER', True), \
+                mock.patch.object(parallel_gen.sys, 'platform', 'darwin'), \
+                mock.patch.object(parallel_gen.multiprocessing, 'get_context') as get_context:
+            results = list(parallel_gen.map_jobs(jobs, 3, ordered=True))
+
+        self.assertFalse(get_context.called)
+        self.assertEqual(results, [parallel_gen.generate_region(job) for job in jobs])
+
+    def test_storage(self):
+        maze = parallel_gen.make_parallel_maze('KruskalsMaze', 21, 21, region_size=7, processes=1, seed=2,
+                                               storage='LIST')
+
+        self.assertIs(type(maze), maze_tools.Maze)
+        self.assertTrue(is_perfect(maze))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+# Copyright 2017 Integrity Software and Games, LLC
+#
+# ##### BEGIN GPL LICENSE BLOCK ######
+# This file is part of UltiMaze.
+#
+# UltiMaze is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# UltiMaze is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+
+import io
+import unittest
+
+import terminal_display
+from maze_tools import ByteMaze
+
+
+class TestMazeText(unittest.TestCase):
+    maxDiff = 10000
+
+    def test_maze_text(self):
+        maze = ByteMaze(3, 2)
+        maze.make_path(0, 0)
+        maze.make_path(1, 0)
+        maze.make_path(2, 1)
+        rows = terminal_display.maze_rows(maze, 3, 2, highlights=[(1, 0), (5, 5)])
+        self.assertEqual(terminal_display.maze_text(rows, 3),
+                         "       \n"
+                         "    012\n"
+                         "   vvvvv\n"
+                         " 0 > $█<\n"
+                         " 1 >██ <\n"
+                         "   ^^^^^")
+
+    def test_wide_and_tall_labels(self):
+        maze = ByteMaze(120, 101)
+        lines = terminal_display.maze_text(terminal_display.maze_rows(maze, 120, 101), 120).split("\n")
+        self.assertEqual(lines[0][5 + 99:5 + 111], "9          1")
+        self.assertEqual(lines[3], "  0 >" + "█" * 120 + "<")
+        self.assertEqual(lines[-2], "100 >" + "█" * 120 + "<")
+        self.assertEqual(len(set(len(line) for line in lines[3:-1])), 1)
+
+
+class TestTerminalDisplay(unittest.TestCase):
+    maxDiff = 10000
+
+    def setUp(self):
+        self.maze = ByteMaze(5, 4)
+        self.stream = io.StringIO()
+        self.display = terminal_display.TerminalDisplay(5, 4, fps=0, stream=self.stream)
+
+    def written(self):
+        text = self.stream.getvalue()
+        self.stream.seek(0)
+        self.stream.truncate()
+        return text
+
+    def test_first_frame_writes_whole_maze(self):
+        self.display.draw(self.maze)
+        rows = terminal_display.maze_rows(self.maze, 5, 4)
+        self.assertEqual(self.written(),
+                         terminal_display.CLEAR_SCREEN + terminal_display.maze_text(rows, 5))
+
+    def test_only_changed_spaces_are_rewritten(self):
+        self.display.draw(self.maze)
+        self.written()
+        self.maze.make_path(1, 2)
+        self.maze.make_path(3, 2)
+        self.display.draw(self.maze, highlights={(4, 0)})
+        # row y is on line y + 4, space x is in column x + 5
+        self.assertEqual(self.written(), "\x1b[4;9H$" "\x1b[6;6H █ " "\x1b[8;11H")
+
+    def test_unchanged_frame_only_moves_cursor(self):
+        self.display.draw(self.maze)
+        self.written()
+        self.display.draw(self.maze)
+        self.assertEqual(self.written(), "\x1b[8;11H")
+
+    def test_frame_rate_is_capped(self):
+        display = terminal_display.TerminalDisplay(5, 4, fps=1, stream=self.stream)
+        self.assertTrue(display.draw(self.maze))
+        self.maze.make_path(0, 0)
+        self.assertFalse(display.draw(self.maze))
+        self.assertTrue(display.draw(self.maze, force=True))
+        self.assertEqual(display.rows[0], " " + "█" * 4)
+
+    def test_finish_draws_last_frame(self):
+        display = terminal_display.TerminalDisplay(5, 4, fps=1, stream=self.stream)
+        display.draw(self.maze)
+        self.maze.make_path(4, 3)
+        display.finish(self.maze)
+        self.assertTrue(self.written().endswith("\x1b[7;9H \x1b[8;11H\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,7 @@ Tile-based maze generation.
 Available Functions:
     console_prog - Displays progress in the console
     add_tile - Adds a tile object to the scene at certain transform
+    tile_from_mask - Chooses what tile to add from a space's connectivity mask
     choose_tile - Chooses what tile to add based on surrounding spaces in maze
     make_tile_maze - Makes tile-based maze
 """
@@ -30,6 +31,7 @@ import math
 
 import bpy
 
+from .maze_tools import DIRECTION_BITS
 from .progress_display import BlenderProgress
 from .addon_name import get_addon_name
 
@@ -95,107 +97,109 @@ def add_tile(tile, x_location, y_location, rotation):
     copy.rotation_euler[2] = math.radians(rotation)
 
 
-def choose_tile(maze, x, y):
-    """Chooses what tile to add based on surrounding spaces in maze.
+# tile and rotation for every connectivity mask (see maze_tools.Maze.connectivity_masks)
+# the index is the sum of the touching paths: N = 1, W = 2, E = 4, S = 8
+FLOOR_TILES = (
+    ('floor_0_sided', 0),    # solitary floor
+    ('floor_1_sided', 0),    # N
+    ('floor_1_sided', 270),  # W
+    ('floor_corner', 270),   # N, W
+    ('floor_1_sided', 90),   # E
+    ('floor_corner', 0),     # N, E
+    ('floor_2_sided', 90),   # W, E
+    ('floor_3_sided', 0),    # N, W, E
+    ('floor_1_sided', 180),  # S
+    ('floor_2_sided', 0),    # N, S
+    ('floor_corner', 180),   # W, S
+    ('floor_3_sided', 270),  # N, W, S
+    ('floor_corner', 90),    # E, S
+    ('floor_3_sided', 90),   # N, E, S
+    ('floor_3_sided', 180),  # W, E, S
+    ('floor_4_sided', 0),    # N, W, E, S
+)
+
+WALL_TILES = (
+    ('wall_0_sided', 0),    # center of wall block
+    ('wall_1_sided', 0),    # N
+    ('wall_1_sided', 270),  # W
+    ('wall_corner', 270),   # N, W
+    ('wall_1_sided', 90),   # E
+    ('wall_corner', 0),     # N, E
+    ('wall_2_sided', 90),   # W, E
+    ('wall_3_sided', 0),    # N, W, E
+    ('wall_1_sided', 180),  # S
+    ('wall_2_sided', 0),    # N, S
+    ('wall_corner', 180),   # W, S
+    ('wall_3_sided', 270),  # N, W, S
+    ('wall_corner', 90),    # E, S
+    ('wall_3_sided', 90),   # N, E, S
+    ('wall_3_sided', 180),  # W, E, S
+    ('wall_4_sided', 0),    # solitary wall
+)
+
+SIX_TILES = (
+    ('no_path', 0),      # solitary wall
+    ('dead_end', 0),     # N
+    ('dead_end', 270),   # W
+    ('turn', 270),       # N, W
+    ('dead_end', 90),    # E
+    ('turn', 0),         # N, E
+    ('straight', 90),    # W, E
+    ('t_int', 0),        # N, W, E
+    ('dead_end', 180),   # S
+    ('straight', 0),     # N, S
+    ('turn', 180),       # W, S
+    ('t_int', 270),      # N, W, S
+    ('turn', 90),        # E, S
+    ('t_int', 90),       # N, E, S
+    ('t_int', 180),      # W, E, S
+    ('four_way', 0),     # N, W, E, S
+)
+
+
+def tile_from_mask(mask, is_path, x, y, tile_mode):
+    """Chooses what tile to add from a space's connectivity mask.
+
+    Args:
+        mask - (int) connectivity mask of the space (see maze_tools.Maze.connectivity_masks)
+        is_path - (boolean) the space is a path
+        x - (int) the x coordinate of the space
+        y - (int) the y coordinate of the space
+        tile_mode - (string) 'TWELVE_TILES' or 'SIX_TILES'
 
     Returns:
         tile name, rotation tile should have
     """
-    # find out how many spaces that are touching are paths
-    directions = maze.find_touching_path_dirs(x, y)
-
-    tm = bpy.context.scene.mg.tile_mode
-
-    if tm == "TWELVE_TILES":
-
-        floor_possibilities = {
-            # four-way floor
-            ('N', 'W', 'E', 'S'): ('floor_4_sided', 0),
-            # three-way floor
-            ('W', 'E', 'S'): ('floor_3_sided', 180),
-            ('N', 'E', 'S'): ('floor_3_sided', 90),
-            ('N', 'W', 'E'): ('floor_3_sided', 0),
-            ('N', 'W', 'S'): ('floor_3_sided', 270),
-            # dead-end floor
-            ('S',): ('floor_1_sided', 180),
-            ('E',): ('floor_1_sided', 90),
-            ('N',): ('floor_1_sided', 0),
-            ('W',): ('floor_1_sided', 270),
-            # solitary floor
-            (): ('floor_0_sided', 0),
-            # straight path floor
-            ('N', 'S'): ('floor_2_sided', 0),
-            ('W', 'E'): ('floor_2_sided', 90),
-            # turn floor
-            ('E', 'S'): ('floor_corner', 90),
-            ('N', 'E'): ('floor_corner', 0),
-            ('N', 'W'): ('floor_corner', 270),
-            ('W', 'S'): ('floor_corner', 180),
-        }
-
-        wall_possibilities = {
-            # solitary wall
-            ('N', 'W', 'E', 'S'): ('wall_4_sided', 0),
-            # end of wall
-            ('W', 'E', 'S'): ('wall_3_sided', 180),
-            ('N', 'E', 'S'): ('wall_3_sided', 90),
-            ('N', 'W', 'E'): ('wall_3_sided', 0),
-            ('N', 'W', 'S'): ('wall_3_sided', 270),
-            # side of wall block
-            ('S',): ('wall_1_sided', 180),
-            ('E',): ('wall_1_sided', 90),
-            ('N',): ('wall_1_sided', 0),
-            ('W',): ('wall_1_sided', 270),
-            # center of wall block
-            (): ('wall_0_sided', 0),
-            # straight wall between two paths
-            ('N', 'S'): ('wall_2_sided', 0),
-            ('W', 'E'): ('wall_2_sided', 90),
-            # corner wall
-            ('E', 'S'): ('wall_corner', 90),
-            ('N', 'E'): ('wall_corner', 0),
-            ('N', 'W'): ('wall_corner', 270),
-            ('W', 'S'): ('wall_corner', 180),
-        }
-
-        if maze.exist_test(x, y) and maze.is_path(x, y):
-            return floor_possibilities[tuple(directions)]
+    if tile_mode == "TWELVE_TILES":
+        if is_path:
+            return FLOOR_TILES[mask]
         else:
-            return wall_possibilities[tuple(directions)]
-
-    elif tm == 'SIX_TILES':
-
-        possibilities = {
-            # four-way floor
-            ('N', 'W', 'E', 'S'): ('four_way', 0),
-            # three-way floor
-            ('W', 'E', 'S'): ('t_int', 180),
-            ('N', 'E', 'S'): ('t_int', 90),
-            ('N', 'W', 'E'): ('t_int', 0),
-            ('N', 'W', 'S'): ('t_int', 270),
-            # dead-end floor
-            ('S',): ('dead_end', 180),
-            ('E',): ('dead_end', 90),
-            ('N',): ('dead_end', 0),
-            ('W',): ('dead_end', 270),
-            # solitary wall
-            (): ('no_path', 0),
-            # straight path floor
-            ('N', 'S'): ('straight', 0),
-            ('W', 'E'): ('straight', 90),
-            # turn floor
-            ('E', 'S'): ('turn', 90),
-            ('N', 'E'): ('turn', 0),
-            ('N', 'W'): ('turn', 270),
-            ('W', 'S'): ('turn', 180),
-        }
+            return WALL_TILES[mask]
+
+    elif tile_mode == 'SIX_TILES':
         # to add in six tile mode the space must be a path and it's x and y must both be even
-        if maze.exist_test(x, y) and maze.is_path(x, y) and not x & 1 and not y & 1:
-            return possibilities[tuple(directions)]
+        if is_path and not x & 1 and not y & 1:
+            return SIX_TILES[mask]
         else:
             return "", 0  # empty tile to show not to add anything
 
 
+def choose_tile(maze, x, y):
+    """Chooses what tile to add based on surrounding spaces in maze.
+
+    Returns:
+        tile name, rotation tile should have
+    """
+    # find out how many spaces that are touching are paths
+    mask = 0
+    for direction in maze.find_touching_path_dirs(x, y):
+        mask |= DIRECTION_BITS[direction]
+
+    is_path = maze.exist_test(x, y) and maze.is_path(x, y)
+
+    return tile_from_mask(mask, is_path, x, y, bpy.context.scene.mg.tile_mode)
+
+
 def make_tile_maze(maze):
     """Makes tile-based maze.
 
@@ -210,18 +214,20 @@ def make_tile_maze(maze):
 
     bpy.ops.object.select_all(action='DESELECT')
 
-    bldr_prog = BlenderProgress("Tile Maze Gen", debug)
+    bldr_prog = BlenderProgress("Tile Maze Gen", debug, throttle=True)
+    bldr_prog.set_total(maze.width * maze.height)
     bldr_prog.start()
-    genloops = 0
+    # one pass over the maze, then every tile is a table lookup
+    masks = maze.connectivity_masks()
+    tile_mode = mg.tile_mode
     for row in range(maze.height):
         for column in range(maze.width):
-            tile, rotation = choose_tile(maze, column, row)
+            tile, rotation = tile_from_mask(masks[row * maze.width + column], maze.is_path(column, row),
+                                            column, row, tile_mode)
             if tile:
                 add_tile(tile, column, row, rotation)
 
-            genloops += 1
-            progress = genloops / (maze.width * maze.height)
-            bldr_prog.update(progress)
+            bldr_prog.tick()
     scene.update()
     bldr_prog.finish()
 
@@ -17,6 +17,8 @@
 # along with UltiMaze.  If not, see <http://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+from array import array
+
 IN_BLENDER = True
 
 if IN_BLENDER:
@@ -28,10 +30,12 @@ logger = setup_logger(__name__)
 
 
 class RebelChildError(Exception):
-    def __init__(self, nodes, parent, child):
+    def __init__(self, nodes, parent, child, rebels=()):
         self.nodes = nodes
         self.parent = parent
         self.child = child
+        # every (parent, child) pair that disagrees, the first is parent and child
+        self.rebels = rebels
 
     def __str__(self):
         return repr(self)
@@ -44,9 +48,11 @@ class RebelChildError(Exception):
 
 
 class LoopInTreeError(Exception):
-    def __init__(self, nodes, looping):
+    def __init__(self, nodes, looping, loops=()):
         self.nodes = nodes
         self.looping = looping
+        # every loop found, the first is looping
+        self.loops = loops
 
     def __str__(self):
 
@@ -65,6 +71,8 @@ class LoopInTreeError(Exception):
 class Tree:
     def __init__(self):
         self.nodes = {}
+        # (levels, depths) from build_level_index, None until it's needed again after the tree changes
+        self.level_index = None
 
     def __str__(self):
         ret = ""
@@ -82,29 +90,55 @@ class Tree:
         return ret
 
     def check_for_bad_dependencies(self):
-        def check_for_rebellious_child():
-            # check for when a node's child doesn't recognize it as a parent
-            for node in self.get_nodes():
-                for child in self.nodes[node]['children']:
-                    if self.nodes[child]['parent'] != node:
-                        raise RebelChildError(self.nodes, node, child)
-
-        def check_for_loops():
-            # check for when a node is parented to it's parent
-            for node in self.get_nodes():
-                nodes_parent = self.nodes[node]['parent']
-                nodes = [node]
-                while nodes_parent is not None:
-                    nodes += [nodes_parent]
-                    if self.nodes[nodes_parent]['parent'] == node:
-                        raise LoopInTreeError(self.nodes, nodes)
-                    nodes_parent = self.nodes[nodes_parent]['parent']
-
-        check_for_rebellious_child()
-        check_for_loops()
+        """Raises RebelChildError or LoopInTreeError if the tree is broken (see find_bad_dependencies)."""
+        rebels, loops = self.find_bad_dependencies()
+        if rebels:
+            parent, child = rebels[0]
+            raise RebelChildError(self.nodes, parent, child, rebels)
+        if loops:
+            raise LoopInTreeError(self.nodes, loops[0], loops)
+
+    def find_bad_dependencies(self):
+        """Finds every rebel child and every loop in the tree, visiting each node and child once.
+
+        A rebel child is in a node's children but doesn't have that node as its parent.  A loop is a chain of
+        parents that comes back around to where it started (a node following the parents into a loop isn't
+        part of it).
+
+        Returns:
+            rebels - [(parent, child), ...]
+            loops - [[node, node's parent, ..., the node whose parent is the first node], ...]
+        """
+        nodes = self.get_nodes()
+        parents = {node: self.get_parent(node) for node in nodes}
+
+        # check for when a node's child doesn't recognize it as a parent
+        rebels = []
+        for node in nodes:
+            for child in self.get_children(node):
+                if parents.get(child) != node:
+                    rebels.append((node, child))
+
+        # check for loops by following the parents from every node, marking the nodes on the current chain
+        # with the chain's number so each node is only ever walked over once
+        loops = []
+        chain_of = {}
+        for chain, node in enumerate(nodes):
+            walked = []
+            while node is not None and node not in chain_of and node in parents:
+                chain_of[node] = chain
+                walked.append(node)
+                node = parents[node]
+
+            # coming back to a node on this chain is a loop, anything else was checked already
+            if node is not None and chain_of.get(node) == chain:
+                loops.append(walked[walked.index(node):])
+
+        return rebels, loops
 
     def new_node(self, name='root', parent=None):
         """Adds a new node to the tree."""
+        self.level_index = None
 
         # create a new key/value for the node
         self.nodes[name] = {'parent': parent, 'children': set()}
@@ -112,6 +146,7 @@ class Tree:
             self.parent(name, parent)
 
     def delete_node(self, node):
+        self.level_index = None
         this_node = self.nodes[node]
 
         # remove from parent's children list
@@ -128,13 +163,14 @@ class Tree:
         """Returns True of child is a child of parent, False otherwise."""
         node = child
         while True:
-            node = self.nodes[node]['parent']
+            node = self.get_parent(node)
             if node == parent:
                 return True
             elif node is None:
                 return False
 
     def parent(self, child, parent):
+        self.level_index = None
         # fix for 'looping' parents
         if self.nodes[parent]['parent'] == child:
             self.nodes[parent]['parent'] = None
@@ -142,6 +178,7 @@ class Tree:
         self.nodes[child]['parent'] = parent
 
     def unparent(self, child):
+        self.level_index = None
         parent = self.nodes[child]['parent']
         if parent is not None:
             self.nodes[parent]['children'].remove(child)
@@ -153,6 +190,7 @@ class Tree:
         print("Only a stub")
 
     def child_shift_detach(self, node):
+        self.level_index = None
         parent = self.nodes[node]['parent']
 
         # attach children to parent
@@ -171,6 +209,7 @@ class Tree:
             logger.info("Node {} is a root already".format(node))
 
     def replacement_child_shift_detach(self, node):
+        self.level_index = None
         children = self.nodes[node]['children']
         if children:
 
@@ -192,58 +231,108 @@ class Tree:
         self.unparent(node)
 
     def prune_leaves(self, iterations):
+        """Removes all the leaves, iterations times over (so every branch loses up to iterations nodes).
+
+        Only the first round looks for leaves in the whole tree.  After that, only parents left without
+        children by the last round can be leaves, so the later rounds cost as much as the nodes they remove.
+        """
+        self.level_index = None
+        leaves = self.get_leaves() if iterations > 0 else []
         for i in range(iterations):
-            leaves = self.get_leaves()
+            if not leaves:
+                break
+
+            new_leaves = []
             for leaf_node in leaves:
                 parent = self.nodes[leaf_node]['parent']
-                try:
-                    self.nodes[parent]['children'].remove(leaf_node)
-                except KeyError:
-                    logger.warning("Removing root from its parent's children list failed: roots don't have parents!")
+                if parent is not None:
+                    siblings = self.nodes[parent]['children']
+                    siblings.discard(leaf_node)
+                    if not siblings:
+                        new_leaves.append(parent)
                 del self.nodes[leaf_node]
+            leaves = new_leaves
 
     def prune_roots(self, iterations):
+        """Removes all the roots, iterations times over (their children become the new roots).
+
+        Only the first round looks for roots in the whole tree, the later rounds only look at the children of
+        the roots just removed.
+        """
+        self.level_index = None
+        roots = self.get_roots() if iterations > 0 else []
         for i in range(iterations):
-            roots = self.get_roots()
+            if not roots:
+                break
+
+            new_roots = []
             for root_node in roots:
                 children = self.nodes[root_node]['children']
                 for child in children:
                     self.nodes[child]['parent'] = None
+                new_roots.extend(children)
                 del self.nodes[root_node]
+            roots = new_roots
+
+    def build_level_index(self):
+        """Finds the level of every node with one breadth first search from the roots.
+
+        The index is kept until the tree is changed, so level and depth queries after the first are only
+        lookups.  Editing self.nodes directly doesn't clear it (set self.level_index to None after doing so).
+
+        Returns:
+            levels - [[nodes at level 0 (roots)], [nodes at level 1], ...]
+            depths - {node: level of node}
+        """
+        levels = []
+        depths = {}
+        level = self.get_roots()
+        while level:
+            for node in level:
+                depths[node] = len(levels)
+            levels.append(level)
+            level = [child for node in level for child in self.get_children(node)]
+
+        self.level_index = levels, depths
+        return self.level_index
+
+    def get_level_index(self):
+        """Returns the (levels, depths) from build_level_index, building them if the tree has changed."""
+        if self.level_index is None:
+            return self.build_level_index()
+        return self.level_index
 
     def num_levels(self):
-        old_lvl_nodes = self.get_roots()
-        # the '[] + ' is to keep it from referencing the same value in memory
-        curr_lvl_nodes = [] + old_lvl_nodes
-        lvls = 0
-        while curr_lvl_nodes:
-            curr_lvl_nodes = []
-            for node in old_lvl_nodes:
-                for child in self.nodes[node]['children']:
-                    curr_lvl_nodes += [child]
-            old_lvl_nodes = curr_lvl_nodes
-            lvls += 1
-        return lvls
+        return len(self.get_level_index()[0])
 
     def get_level(self, lvl):
         """Returns [nodes] at lvl where lvl = 0 returns roots."""
-        old_lvl_nodes = self.get_roots()
-        # the '[] + ' is to keep it from referencing the same value in memory
-        curr_lvl_nodes = [] + old_lvl_nodes
-        for i in range(lvl):
-            curr_lvl_nodes = []
-            for node in old_lvl_nodes:
-                for child in self.nodes[node]['children']:
-                    curr_lvl_nodes += [child]
-            old_lvl_nodes = curr_lvl_nodes
-        return curr_lvl_nodes
+        levels = self.get_level_index()[0]
+        lvl = max(lvl, 0)
+        if lvl < len(levels):
+            # a copy, so changing it doesn't change the index
+            return list(levels[lvl])
+        return []
+
+    def get_depth(self, node):
+        """Returns the level node is on (0 for roots)."""
+        return self.get_level_index()[1][node]
 
     def get_root(self, child):
         node = child
         while True:
-            if self.nodes[node]['parent'] is None:
+            parent = self.get_parent(node)
+            if parent is None:
                 return node
-            node = self.nodes[node]['parent']
+            node = parent
+
+    def get_parent(self, node):
+        """Returns the parent of node (None for roots)."""
+        return self.nodes[node]['parent']
+
+    def get_children(self, node):
+        """Returns the children of node."""
+        return self.nodes[node]['children']
 
     def get_nodes(self):
         return [a for a in self.nodes]
@@ -255,9 +344,11 @@ class Tree:
         return [a for a in self.nodes if self.nodes[a]['parent'] is None]
 
     def clear(self):
+        self.level_index = None
         self.nodes = {}
 
     def unparent_children(self, parent):
+        self.level_index = None
         # set all children as roots
         for child in self.nodes[parent]['children']:
             self.nodes[child]['parent'] = None
@@ -266,6 +357,306 @@ class Tree:
         self.nodes[parent]['children'] = set()
 
 
+class IntTree(Tree):
+    """Tree for nodes named by ints (0 and up) stored in flat arrays instead of a dict of dicts.
+
+    Every node has its parent, first child and next/previous sibling in parallel arrays (-1 for none), so
+    parenting is a few array writes and no sets of children are made.  The roots and leaves are kept in sets
+    that are updated on every change, so is_root, is_leaf, get_roots and get_leaves don't scan the tree.
+
+    The node names index the arrays, so they should be small ints, like the index of a space in a maze.
+    The nodes property builds the same dict as Tree.nodes (for tests and debugging, it's slow).
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.level_index = None
+        self.parents = array('i')
+        self.first_children = array('i')
+        self.next_siblings = array('i')
+        self.prev_siblings = array('i')
+        self.exists = bytearray()
+        self.roots = set()
+        self.leaves = set()
+        self.num_nodes = 0
+
+    def __len__(self):
+        return self.num_nodes
+
+    @property
+    def nodes(self):
+        """Returns the tree in the format of Tree.nodes: {name: {'parent': parent, 'children': set()}}."""
+        return {node: {'parent': self.get_parent(node), 'children': set(self.get_children(node))}
+                for node in self.get_nodes()}
+
+    def grow(self, size):
+        """Makes the arrays long enough to hold nodes 0 to size - 1 (at least doubling them, so adding nodes
+        one at a time doesn't extend them every time)."""
+        extra = size - len(self.exists)
+        if extra > 0:
+            extra = max(extra, len(self.exists))
+            empty = array('i', [-1]) * extra
+            self.parents.extend(empty)
+            self.first_children.extend(empty)
+            self.next_siblings.extend(empty)
+            self.prev_siblings.extend(empty)
+            self.exists.extend(bytes(extra))
+
+    def check_node(self, node):
+        """Raises KeyError if node isn't in the tree (like Tree.nodes[node] would)."""
+        if node < 0 or node >= len(self.exists) or not self.exists[node]:
+            raise KeyError(node)
+
+    def link(self, child, parent):
+        """Adds root child to the front of parent's children."""
+        self.level_index = None
+        first = self.first_children[parent]
+        self.next_siblings[child] = first
+        self.prev_siblings[child] = -1
+        if first == -1:
+            self.leaves.discard(parent)
+        else:
+            self.prev_siblings[first] = child
+        self.first_children[parent] = child
+        self.parents[child] = parent
+        self.roots.discard(child)
+
+    def unlink(self, child):
+        """Removes child from its parent's children, making it a root."""
+        self.level_index = None
+        parent = self.parents[child]
+        prev_sibling = self.prev_siblings[child]
+        next_sibling = self.next_siblings[child]
+        if prev_sibling == -1:
+            self.first_children[parent] = next_sibling
+            if next_sibling == -1:
+                self.leaves.add(parent)
+        else:
+            self.next_siblings[prev_sibling] = next_sibling
+        if next_sibling != -1:
+            self.prev_siblings[next_sibling] = prev_sibling
+
+        self.parents[child] = -1
+        self.prev_siblings[child] = -1
+        self.next_siblings[child] = -1
+        self.roots.add(child)
+
+    def new_node(self, name=0, parent=None):
+        """Adds a new node to the tree."""
+        self.level_index = None
+        if name < 0:
+            raise ValueError("IntTree node names can't be negative: {}".format(name))
+        if parent is not None:
+            self.check_node(parent)
+
+        if name >= len(self.exists):
+            self.grow(name + 1)
+        if self.exists[name]:
+            # replace the old node
+            self.unparent_children(name)
+            if self.parents[name] != -1:
+                self.unlink(name)
+        else:
+            self.exists[name] = 1
+            self.num_nodes += 1
+            self.leaves.add(name)
+            if parent is None:
+                self.roots.add(name)
+            else:
+                # a new node has no parent or children, so it can be linked straight away
+                self.link(name, parent)
+                return
+
+        if parent is not None:
+            self.parent(name, parent)
+
+    def delete_node(self, node):
+        """Removes node from the tree, its children become roots."""
+        self.level_index = None
+        self.check_node(node)
+        self.unparent_children(node)
+        if self.parents[node] != -1:
+            self.unlink(node)
+
+        self.exists[node] = 0
+        self.num_nodes -= 1
+        self.roots.discard(node)
+        self.leaves.discard(node)
+
+    def parent(self, child, parent):
+        self.check_node(child)
+        self.check_node(parent)
+        # fix for 'looping' parents
+        if self.parents[parent] == child:
+            self.unlink(parent)
+        if self.parents[child] != -1:
+            self.unlink(child)
+        self.link(child, parent)
+
+    def unparent(self, child):
+        self.check_node(child)
+        if self.parents[child] != -1:
+            self.unlink(child)
+        else:
+            logger.warning("Node {} is a root! Cannot unparent root!".format(child))
+
+    def child_shift_detach(self, node):
+        self.check_node(node)
+        parent = self.get_parent(node)
+
+        # attach children to parent
+        for child in self.get_children(node):
+            self.unlink(child)
+            if parent is not None:
+                self.link(child, parent)
+
+        # remove from parent's children list and set as root
+        if parent is not None:
+            self.unlink(node)
+        else:
+            logger.info("Node {} is a root already".format(node))
+
+    def replacement_child_shift_detach(self, node):
+        self.check_node(node)
+        first_child = self.first_children[node]
+        if first_child != -1:
+            # the first child takes the node's place and the rest of the children are parented to it
+            children = self.get_children(node)
+            for child in children:
+                self.unlink(child)
+            if self.parents[node] != -1:
+                self.link(first_child, self.parents[node])
+            for child in children[1:]:
+                self.link(child, first_child)
+        # detach node (should have no children now)
+        self.unparent(node)
+
+    def prune_leaves(self, iterations):
+        # the leaves are always known, so every round costs as much as the nodes it removes
+        leaves = self.get_leaves() if iterations > 0 else []
+        for i in range(iterations):
+            new_leaves = []
+            for leaf_node in leaves:
+                parent = self.parents[leaf_node]
+                self.delete_node(leaf_node)
+                if parent != -1 and self.first_children[parent] == -1:
+                    new_leaves.append(parent)
+            leaves = new_leaves
+
+    def prune_roots(self, iterations):
+        roots = self.get_roots() if iterations > 0 else []
+        for i in range(iterations):
+            new_roots = []
+            for root_node in roots:
+                new_roots.extend(self.get_children(root_node))
+                self.delete_node(root_node)
+            roots = new_roots
+
+    def unparent_children(self, parent):
+        # set all children as roots
+        for child in self.get_children(parent):
+            self.unlink(child)
+
+    def get_parent(self, node):
+        """Returns the parent of node (None for roots)."""
+        self.check_node(node)
+        parent = self.parents[node]
+        return None if parent == -1 else parent
+
+    def get_children(self, node):
+        """Returns a list of the children of node."""
+        self.check_node(node)
+        children = []
+        child = self.first_children[node]
+        while child != -1:
+            children.append(child)
+            child = self.next_siblings[child]
+        return children
+
+    def get_root(self, child):
+        self.check_node(child)
+        parents = self.parents
+        while parents[child] != -1:
+            child = parents[child]
+        return child
+
+    def is_root(self, node):
+        """Returns True if node has no parent, False otherwise."""
+        return node in self.roots
+
+    def is_leaf(self, node):
+        """Returns True if node has no children, False otherwise."""
+        return node in self.leaves
+
+    def get_nodes(self):
+        return [a for a, exists in enumerate(self.exists) if exists]
+
+    def get_leaves(self):
+        return list(self.leaves)
+
+    def get_roots(self):
+        return list(self.roots)
+
+
+class DisjointSet:
+    """Union-find over the ints 0 to size - 1 with path compression and union by rank.
+
+    Unlike Tree, the sets can only be merged (never split) and the members are the indexes of two flat arrays,
+    so finding a set is nearly constant time however the merges come in.
+    """
+    def __init__(self, size=0):
+        # every member starts as the root of its own set (4 byte ints, plenty for any maze's lattice)
+        self.parents = array('i', range(size))
+        # ranks are at most log2(size) so they fit in a byte
+        self.ranks = bytearray(size)
+        self.num_sets = size
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self):
+        """Adds a new member in a set of its own and returns it."""
+        member = len(self.parents)
+        self.parents.append(member)
+        self.ranks.append(0)
+        self.num_sets += 1
+        return member
+
+    def find(self, member):
+        """Returns the root of member's set, pointing every member on the way straight at it."""
+        parents = self.parents
+        root = member
+        while parents[root] != root:
+            root = parents[root]
+
+        while parents[member] != root:
+            parents[member], member = root, parents[member]
+        return root
+
+    def union(self, a, b):
+        """Merges the sets of a and b, returns False if they were already the same set, True otherwise."""
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return False
+
+        # the shallower tree goes under the deeper one so the depth only grows when they are even
+        ranks = self.ranks
+        if ranks[root_a] < ranks[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        if ranks[root_a] == ranks[root_b]:
+            ranks[root_a] += 1
+
+        self.num_sets -= 1
+        return True
+
+    def same_set(self, a, b):
+        """Returns True if a and b are in the same set, False otherwise."""
+        return self.find(a) == self.find(b)
+
+
 def main():
     tree = Tree()
     tree.new_node(name='root')
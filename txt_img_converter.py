@@ -22,18 +22,20 @@ Converts back and forth between image and text mazes.
 
 Available Functions:
     console_prog - Displays progress in the console
+    new_text_block - Makes a text block named after the size of the maze in it
     write_to_text - Writes text to Blender text file with current width and
                     height settings
     write_to_text_img - Writes text to Blender text file with given width and
                         height
     str_list_maze - Converts a python maze into a text block
+    write_rows_to_text - Writes rows of a maze to a text block one at a time
     convert_list_maze - Convert text maze into a Python list maze
 """
 
 import bpy
 
 from . import prep_manager
-from .maze_tools import Maze
+from .maze_tools import ByteMaze, rows_to_text, read_text_maze
 from .progress_display import BlenderProgress
 from .time_display import TimeDisplay
 from .logging_setup import setup_logger
@@ -42,6 +44,20 @@ from .addon_name import get_addon_name
 logger = setup_logger(__name__)
 
 
+def new_text_block(width, height):
+    """Makes a text block named after the size of the maze in it.
+
+    Args:
+        width - width of maze
+        height - height of maze
+
+    Returns:
+        the new text block (Blender adds a number to the name if it's taken)
+    """
+    attempted_name = (str(width) + "x" + str(height) + "_maze_list")
+    return bpy.data.texts.new(name=attempted_name)
+
+
 def write_to_text(text):
     """Writes text to Blender text file with current width and height settings.
 
@@ -54,10 +70,8 @@ def write_to_text(text):
     width = bpy.context.scene.mg.mg_width
     height = bpy.context.scene.mg.mg_height
 
-    attempted_name = (str(width) + "x" + str(height) + "_maze_list")
-
     text_block = [""]
-    text_data_block = bpy.data.texts.new(name=attempted_name)
+    text_data_block = new_text_block(width, height)
     text_block[0] = text_data_block
 
     text_block[0].from_string(str(text))
@@ -78,10 +92,8 @@ def write_to_text_img(text, width, height):
     Returns:
         actual name of text block it wrote to
     """
-    attempted_name = (str(width) + "x" + str(height) + "_maze_list")
-
     text_block = [""]
-    text_data_block = bpy.data.texts.new(name=attempted_name)
+    text_data_block = new_text_block(width, height)
     text_block[0] = text_data_block
 
     text_block[0].from_string(text)
@@ -102,17 +114,28 @@ def str_list_maze(maze):
     Returns:
         actual name of text block it wrote to
     """
-    str_maze = ""
-    for row in range(maze.height):
-        for column in range(maze.width):
-            if maze.is_path(column, row):
-                str_maze += "1"
-            else:
-                str_maze += "0"
+    return write_rows_to_text((maze.get_row(y) for y in range(maze.height)), maze.width, maze.height)
 
-    text_block_name = write_to_text(str_maze)
 
-    return text_block_name
+def write_rows_to_text(rows, width, height):
+    """Writes rows of a maze to a text block one at a time.
+
+    Args:
+        rows - iterable of rows of 1's and 0's, like maze_tools.ellers_rows, so the whole maze never has to be
+            in memory at once
+        width - width of maze
+        height - height of maze
+
+    Returns:
+        actual name of text block it wrote to
+    """
+    text_data_block = new_text_block(width, height)
+
+    # no newlines between the rows, the same text write_to_text always wrote
+    for line in rows_to_text(rows, end=""):
+        text_data_block.write(line)
+
+    return text_data_block.name
 
 
 def convert_list_maze():
@@ -134,7 +157,7 @@ def convert_list_maze():
     x_dim = mg.mg_width
     y_dim = mg.mg_height
 
-    maze = Maze(x_dim, y_dim)
+    maze = ByteMaze(x_dim, y_dim)
     for y in range(maze.height):
         for x in range(maze.width):
             index = y * maze.width + x
@@ -261,15 +284,14 @@ class CreateImageFromListMG(bpy.types.Operator):
                         "valid path or disable save texts in user prefs")
             return {'CANCELLED'}
 
-        bldr_prog = BlenderProgress("Text to Image", debug)
+        bldr_prog = BlenderProgress("Text to Image", debug, throttle=True)
         bldr_prog.start()
 
-        # get list maze as string
-        str_list_maze = bpy.data.texts[mg.list_maze].as_string()
-
-        # settings check before execution
+        # get list maze as string (without any newlines, like convert_list_maze) and check it fits the settings
         area = mg.mg_width * mg.mg_height
-        if len(str_list_maze) != area:
+        try:
+            str_list_maze = read_text_maze(bpy.data.texts[mg.list_maze].as_string(), mg.mg_width, mg.mg_height)
+        except ValueError:
             self.report({'ERROR'}, "Width and Height settings don't match " +
                         "selected textblock! Width x Height should equal the number " +
                         "of characters in text.")
@@ -300,9 +322,8 @@ class CreateImageFromListMG(bpy.types.Operator):
                     image_maze.pixels[(image_row * mg.mg_width * 4 +
                                        image_col * 4 + 3)] = 1
 
-                # report progress if changed
-                progress = count / area
-                bldr_prog.update(progress)
+                # report progress when the whole percent changes
+                bldr_prog.update(count / area)
 
                 image_col += 1
                 count += 1
@@ -20,7 +20,10 @@
 """WEIghted RAndom Number Generator aka WeiRa"""
 
 
-from random import random
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, combinations, permutations
+from math import factorial
+import random
 
 
 def unpack(list_items):
@@ -29,30 +32,206 @@ def unpack(list_items):
     return items, weights
 
 
-def weira_choice(list_items):
-    """list_items = [[item1, prob], [item2, prob], ...]"""
+def weira_choice(list_items, rng=random):
+    """list_items = [[item1, prob], [item2, prob], ...]
+
+    The random number is rounded to a whole number up to the sum of the weights, and the first item whose
+    range of the running sum holds it is picked.  rng is the random.Random (or the random module) to use.
+    """
     items, weights = unpack(list_items)
-    
-    factor = sum(weights)
-    rand = random()
-    val = round(rand * factor)
-    
-    i = 0
-    while i < len(weights):
-        if sum(weights[:i]) <= val <= sum(weights[:i+1]):
-            return items[i]
-        i += 1
-
-
-def weira_shuffle(list_items, bias):
+    if not weights:
+        return None
+
+    # running_sums[i] is sum(weights[:i + 1]), the first one at or past the value is the item picked
+    running_sums = list(accumulate(weights))
+    val = round(rng.random() * running_sums[-1])
+
+    return items[bisect_left(running_sums, val)]
+
+
+def weira_shuffle(list_items, bias, rng=random):
     items, weights = unpack(list_items)
-    weights = [bias * a + random() * max(weights) + min(weights) for a in weights]
+    scale = max(weights)
+    offset = min(weights)
+    rand = rng.random
+    weights = [bias * a + rand() * scale + offset for a in weights]
 
     ordered_list = [x for (y, x) in sorted(zip(weights, items), key=lambda pair: pair[0])]
 
     return ordered_list
 
 
+def choose(n, k):
+    """Returns the number of ways to choose k of n things."""
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def shuffle_permutations(weights, bias):
+    """Returns every order weira_shuffle can put items with these weights in and the chance of each order.
+
+    Only works for weights with at most 2 different values (like the [0, 0, 1, 1] of a maze's axis bias).
+    weira_shuffle sorts by keys spread evenly over [bias * weight + min, bias * weight + min + max], so the
+    items with the low weight get keys from one range and the rest from the same range moved up by
+    t = bias * (high weight - low weight) / max (as a fraction of the range).  Where the ranges overlap the
+    keys are all equally likely to come in any order, so the chance of a pattern of low and high keys is:
+
+        sum over i low keys and j high keys in the overlap of
+            P(i low keys in the overlap) * P(j high keys in the overlap) / (ways to interleave i and j keys)
+
+    where a low key lands in the overlap with chance 1 - t, and so does a high key.  Every way of putting
+    the low items on the low places of a pattern (and high items on the high places) is equally likely.
+
+    Args:
+        weights - [weight, ...] of the items to shuffle
+        bias - the bias passed to weira_shuffle
+
+    Returns:
+        [(order, chance), ...] - order is a tuple of the item indexes as weira_shuffle would sort them,
+        orders that can't happen are left out
+    """
+    num_items = len(weights)
+    scale = max(weights)
+    offsets = [bias * weight + min(weights) for weight in weights]
+    if scale == 0:
+        # every key is the same, so the stable sort keeps the items in order
+        return [(tuple(range(num_items)), 1.0)]
+
+    low_offset = min(offsets)
+    if len(set(offsets)) > 2:
+        raise ValueError("Only weights with up to 2 different values can be made into a table: {}".format(weights))
+    low = [i for i in range(num_items) if offsets[i] == low_offset]
+    high = [i for i in range(num_items) if offsets[i] != low_offset]
+    shift = (max(offsets) - low_offset) / scale
+    overlap = min(max(1.0 - shift, 0.0), 1.0)
+
+    # chances of the patterns of low (False) and high (True) keys in sorted order
+    patterns = {}
+    for i in range(len(low) + 1):
+        low_chance = choose(len(low), i) * overlap ** i * (1 - overlap) ** (len(low) - i)
+        for j in range(len(high) + 1):
+            high_chance = choose(len(high), j) * overlap ** j * (1 - overlap) ** (len(high) - j)
+            chance = low_chance * high_chance
+            if not chance:
+                continue
+
+            # each way of interleaving the keys in the overlap is as likely as the rest
+            mixed = i + j
+            interleavings = list(combinations(range(mixed), j))
+            for high_places in interleavings:
+                pattern = ((False,) * (len(low) - i) + tuple(k in high_places for k in range(mixed)) +
+                           (True,) * (len(high) - j))
+                patterns[pattern] = patterns.get(pattern, 0.0) + chance / len(interleavings)
+
+    # every order of the low items and of the high items is as likely as the rest
+    shares = factorial(len(low)) * factorial(len(high))
+    orders = []
+    for pattern, chance in sorted(patterns.items()):
+        for low_order in permutations(low):
+            for high_order in permutations(high):
+                low_items = iter(low_order)
+                high_items = iter(high_order)
+                order = tuple(next(high_items) if is_high else next(low_items) for is_high in pattern)
+                orders.append((order, chance / shares))
+    return orders
+
+
+class CumulativeSampler:
+    """Picks items in proportion to their weights with a table of running sums built once.
+
+    Each choice is one random number and a binary search, O(log n).
+    """
+    def __init__(self, list_items, rng=random):
+        """list_items = [[item1, weight], [item2, weight], ...], the weights don't need to add up to 1."""
+        self.items, weights = unpack(list_items)
+        self.rng = rng
+        self.running_sums = list(accumulate(weights))
+        self.total = self.running_sums[-1]
+
+    def choice(self):
+        """Returns a random item, items with more weight are more likely."""
+        value = self.rng.random() * self.total
+        index = bisect_right(self.running_sums, value)
+        if index == len(self.items):
+            # random() * total rounded up to the total, pick the last item that has any weight
+            index = bisect_left(self.running_sums, value)
+        return self.items[index]
+
+
+class AliasSampler:
+    """Picks items in proportion to their weights in constant time with an alias table (Vose's method).
+
+    Building the table is O(n).  Every column of the table holds one item and, for the rest of its share, an
+    alias of another item, so a choice is one random column and one coin flip.
+    """
+    def __init__(self, list_items, rng=random):
+        """list_items = [[item1, weight], [item2, weight], ...], the weights don't need to add up to 1."""
+        self.items, weights = unpack(list_items)
+        self.rng = rng
+        num_items = len(weights)
+        total = sum(weights)
+
+        # the weights scaled so the average is 1, each column is split between its item and an alias
+        scaled = [weight * num_items / total for weight in weights]
+        self.keep_chances = [1.0] * num_items
+        self.aliases = list(range(num_items))
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            # the rest of the small item's column goes to the large item
+            self.keep_chances[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # whatever is left is 1 (give or take rounding errors), so those columns keep their item
+
+    def choice(self):
+        """Returns a random item, items with more weight are more likely."""
+        column = self.rng.random() * len(self.items)
+        index = int(column)
+        # the fraction of the column is the coin flip
+        if column - index < self.keep_chances[index]:
+            return self.items[index]
+        return self.items[self.aliases[index]]
+
+
+class WeightedShuffler:
+    """Shuffles items so the ones with more weight tend to come first (Efraimidis-Spirakis keys).
+
+    Every item gets the key random() ** (1 / weight) and the items are sorted by key, largest first.  This
+    is the same as picking items one at a time in proportion to their weights without putting them back.
+    The weights are fixed when it's made and the key and order lists are reused on every shuffle.
+    """
+    def __init__(self, weights, rng=random):
+        """weights - [weight of item 0, weight of item 1, ...], items with a weight of 0 always come last."""
+        self.rng = rng
+        self.exponents = [1.0 / weight if weight > 0 else 0.0 for weight in weights]
+        self.keys = [0.0] * len(weights)
+        self.order = list(range(len(weights)))
+        self.indexes = range(len(weights))
+
+    def shuffle_order(self):
+        """Returns the indexes of the items in shuffled order (the same list every time, so copy it to keep it)."""
+        keys = self.keys
+        rand = self.rng.random
+        for i, exponent in enumerate(self.exponents):
+            keys[i] = rand() ** exponent if exponent else -1.0
+
+        # start from the original order so ties always break the same way
+        self.order[:] = self.indexes
+        self.order.sort(key=keys.__getitem__, reverse=True)
+        return self.order
+
+    def shuffle(self, items):
+        """Returns a new list of items in shuffled order."""
+        return [items[i] for i in self.shuffle_order()]
+
+
 def main():
     list_items = [['a', 1], ['b', 10], ['c', 0]]
     print(weira_shuffle(list_items, 1))